@@ -0,0 +1,31 @@
+import time
+
+from django.core.cache import cache
+
+POPULAR_PRODUCTS_CACHE_TIMEOUT = 60 * 10
+POPULAR_PRODUCTS_VERSION_KEY = 'popular-products:version'
+PROMOTIONS_VERSION_KEY = 'promotions:version'
+
+
+def popular_products_cache_version():
+    """Return the current version of the cached popular products listing."""
+    return cache.get_or_set(POPULAR_PRODUCTS_VERSION_KEY, time.time_ns, None)
+
+
+def invalidate_popular_products_cache():
+    """
+    Bump the popular products version.
+    Entries cached under the previous version are never read again and
+    expire on their own, so no pattern delete is needed.
+    """
+    cache.set(POPULAR_PRODUCTS_VERSION_KEY, time.time_ns(), None)
+
+
+def promotions_cache_version():
+    """Return the current version of the promotions listing (time.time_ns() of the last change)."""
+    return cache.get_or_set(PROMOTIONS_VERSION_KEY, time.time_ns, None)
+
+
+def invalidate_promotions_cache():
+    """Bump the promotions version so conditional GETs of the listing stop matching."""
+    cache.set(PROMOTIONS_VERSION_KEY, time.time_ns(), None)
@@ -0,0 +1,36 @@
+"""
+JSON reading and writing for the product import and update management commands.
+
+Scraped product files and Batch API files can be large, so they are handled with
+orjson when it is installed (it already backs the API renderer) and with the
+standard json module otherwise. orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers
+handle the same exception either way.
+"""
+import json
+
+try:
+    import orjson
+    ORJSON_SUPPORT = True
+except ImportError:
+    ORJSON_SUPPORT = False
+
+
+def loads_json(content):
+    """Parse a JSON document given as str or UTF-8 bytes"""
+    if ORJSON_SUPPORT:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def load_json_file(path):
+    """Read and parse a JSON file in one pass over its raw bytes"""
+    with open(path, 'rb') as f:
+        content = f.read()
+    return loads_json(content)
+
+
+def dump_json_lines(records):
+    """Serialize records as JSON Lines: UTF-8 bytes, one object per line"""
+    if ORJSON_SUPPORT:
+        return b''.join(orjson.dumps(record) + b'\n' for record in records)
+    return ''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in records).encode('utf-8')
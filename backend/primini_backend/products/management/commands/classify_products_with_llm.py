@@ -9,10 +9,15 @@ This command:
 5. Generates detailed logs of the process
 """
 
+import hashlib
 import json
 import os
+import re
+import sqlite3
 import time
 from datetime import datetime
+from functools import lru_cache
+from itertools import islice
 from pathlib import Path
 
 from django.core.management.base import BaseCommand
@@ -20,6 +25,8 @@ from django.db import transaction
 from django.utils.text import slugify
 from django.conf import settings
 
+from primini_backend.products.json_files import dump_json_lines, loads_json
+from primini_backend.products.matching import scored_matches
 from primini_backend.products.models import Category, Product
 
 # Try to import OpenAI
@@ -132,6 +139,12 @@ CATEGORIES_DATA = {
 }
 
 
+@lru_cache(maxsize=None)
+def normalize_product_name(name):
+    """Lowercase a product name and collapse its whitespace; cached per name"""
+    return ' '.join(name.lower().split())
+
+
 class Command(BaseCommand):
     help = 'Classify products into categories and subcategories using ChatGPT'
 
@@ -164,11 +177,52 @@ class Command(BaseCommand):
             default=1.0,
             help='Delay between API calls in seconds (default: 1.0)'
         )
+        parser.add_argument(
+            '--max-retries',
+            type=int,
+            default=2,
+            help='Retries of a failed API call (rate limits, timeouts, server errors) with exponential backoff (default: 2)'
+        )
+        parser.add_argument(
+            '--batch',
+            action='store_true',
+            help='Submit all products as one OpenAI Batch API job (half price, results within 24h) instead of one request each'
+        )
+        parser.add_argument(
+            '--batch-poll-interval',
+            type=float,
+            default=60.0,
+            help='Seconds between status checks of a --batch job (default: 60)'
+        )
+        parser.add_argument(
+            '--numbered-answers',
+            action='store_true',
+            help='Ask the LLM for the number of the chosen subcategory instead of a JSON object, '
+                 'a few output tokens per product (not used with --batch-size)'
+        )
+        parser.add_argument(
+            '--reuse-similarity',
+            type=float,
+            default=1.0,
+            help='Reuse the classification of an already classified product whose name is at least this similar '
+                 'instead of calling the LLM (0-1, default: 1.0 = identical names only)'
+        )
+        parser.add_argument(
+            '--cache',
+            action='store_true',
+            help='Keep LLM classifications in a cache file and reuse them in later runs (same model and categories)'
+        )
+        parser.add_argument(
+            '--cache-file',
+            type=str,
+            default=None,
+            help='Path to the classification cache file (default: auto-generated)'
+        )
         parser.add_argument(
             '--batch-size',
             type=int,
             default=1,
-            help='Number of products to process in each batch (default: 1)'
+            help='Number of products classified by each LLM request, not used with --batch (default: 1)'
         )
         parser.add_argument(
             '--resume',
@@ -190,11 +244,19 @@ class Command(BaseCommand):
             'skipped': 0,
             'errors': 0,
             'api_calls': 0,
+            'reused': 0,
         }
         self.log_file = None
         self.resume_file = None
         self.last_processed_id = None
         self.client = None
+        self.categories_prompt = None
+        self.category_options = None
+        # Classifications from the LLM this run, by normalized product name
+        self.classification_cache = {}
+        self.cached_names = []
+        self.cache_db = None
+        self.cache_scope = None
 
     def setup_logging(self, resume_file_path=None):
         """Create log file with timestamp"""
@@ -223,6 +285,40 @@ class Command(BaseCommand):
         self.log(f'Log file: {log_file_path}')
         self.log(f'Resume file: {self.resume_file}')
 
+    def setup_cache(self, cache_file_path=None):
+        """
+        Open the SQLite classification cache and load the entries made with the
+        current model and categories, so they are reused like this run's answers
+        """
+        if cache_file_path:
+            cache_file = Path(cache_file_path)
+        else:
+            cache_file = Path(settings.BASE_DIR) / 'classify_products_cache.db'
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        
+        self.cache_db = sqlite3.connect(cache_file)
+        self.cache_db.execute(
+            'CREATE TABLE IF NOT EXISTS classifications ('
+            'model TEXT, categories_hash TEXT, name TEXT, category TEXT, subcategory TEXT, '
+            'PRIMARY KEY (model, categories_hash, name))'
+        )
+        # Answers only carry over while the model and the category list are unchanged
+        categories_json, _ = self.build_categories_prompt()
+        self.cache_scope = (
+            self.options['model'],
+            hashlib.sha1(categories_json.encode('utf-8')).hexdigest(),
+        )
+        rows = self.cache_db.execute(
+            'SELECT name, category, subcategory FROM classifications '
+            'WHERE model = ? AND categories_hash = ? ORDER BY rowid',
+            self.cache_scope
+        )
+        for name, category, subcategory in rows:
+            self.classification_cache[name] = {'category': category, 'subcategory': subcategory}
+            self.cached_names.append(name)
+        
+        self.log(f'Cache file: {cache_file} ({len(self.cached_names)} cached classifications)')
+
     def log(self, message, level='INFO'):
         """Write to both console and log file"""
         timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
@@ -254,7 +350,9 @@ class Command(BaseCommand):
         if not api_key.startswith('sk-'):
             self.log(f'WARNING: API key format looks incorrect (should start with sk-)', 'WARNING')
         
-        self.client = OpenAI(api_key=api_key)
+        # The client retries rate limits, timeouts and server errors itself, with
+        # jittered exponential backoff that honours the Retry-After header
+        self.client = OpenAI(api_key=api_key, max_retries=self.options['max_retries'])
         
         # Test the API key with a simple request
         try:
@@ -279,23 +377,76 @@ class Command(BaseCommand):
         self.log(f'OpenAI client initialized with model: {self.options["model"]}')
 
     def build_categories_prompt(self):
-        """Build the categories structure for the prompt"""
+        """Build the categories structure for the prompt (once per run, CATEGORIES_DATA is static)"""
+        if self.categories_prompt is not None:
+            return self.categories_prompt
+        
         # Include the actual JSON structure so ChatGPT can see the exact format
         categories_json = json.dumps(CATEGORIES_DATA, indent=2, ensure_ascii=False)
         
-        categories_text = "Available categories and subcategories:\n\n"
+        # Collect the pieces and join once instead of growing the string
+        parts = ["Available categories and subcategories:\n\n"]
         for cat in CATEGORIES_DATA['categories']:
-            categories_text += f"- {cat['name']}:\n"
-            for subcat in cat['subcategories']:
-                categories_text += f"  - {subcat}\n"
-            categories_text += "\n"
+            parts.append(f"- {cat['name']}:\n")
+            parts.extend(f"  - {subcat}\n" for subcat in cat['subcategories'])
+            parts.append("\n")
+        categories_text = "".join(parts)
         
-        return categories_json, categories_text
+        self.categories_prompt = (categories_json, categories_text)
+        return self.categories_prompt
 
-    def classify_product(self, product_name, model='gpt-4o-mini'):
-        """Send product name to ChatGPT and get category/subcategory classification"""
-        if not self.client:
-            raise ValueError('OpenAI client not initialized')
+    def build_category_options(self):
+        """
+        Numbered (category, subcategory) choices for --numbered-answers, with
+        their prompt text (once per run, CATEGORIES_DATA is static)
+        """
+        if self.category_options is not None:
+            return self.category_options
+        
+        options = [
+            (cat['name'], subcat)
+            for cat in CATEGORIES_DATA['categories']
+            for subcat in cat['subcategories']
+        ]
+        options_text = "".join(
+            f"{number}. {category} > {subcategory}\n"
+            for number, (category, subcategory) in enumerate(options, 1)
+        )
+        
+        self.category_options = (options, options_text)
+        return self.category_options
+
+    def build_numbered_classification_messages(self, product_name):
+        """Build the chat messages asking the LLM for the number of one product's subcategory"""
+        _, options_text = self.build_category_options()
+        
+        prompt = f"""You are a product classification assistant. Your task is to classify a product into one of these categories and subcategories:
+
+{options_text}
+Product name: "{product_name}"
+
+If the product doesn't fit perfectly, choose the closest match.
+Reply with ONLY the number of the chosen line, no additional text."""
+
+        return [
+            {
+                'role': 'system',
+                'content': 'You are a product classification assistant. Always respond with a single number only.'
+            },
+            {
+                'role': 'user',
+                'content': prompt
+            }
+        ]
+
+    def classification_max_tokens(self):
+        """Output token budget of a single-product classification request"""
+        return 5 if self.options.get('numbered_answers') else 150
+
+    def build_classification_messages(self, product_name):
+        """Build the chat messages asking the LLM to classify one product"""
+        if self.options.get('numbered_answers'):
+            return self.build_numbered_classification_messages(product_name)
         
         categories_json, categories_text = self.build_categories_prompt()
         
@@ -325,65 +476,270 @@ CRITICAL RULES:
 
 JSON response:"""
 
+        return [
+            {
+                'role': 'system',
+                'content': 'You are a product classification assistant. Always respond with valid JSON only.'
+            },
+            {
+                'role': 'user',
+                'content': prompt
+            }
+        ]
+
+    def parse_classification(self, result_text):
+        """Parse the LLM's answer (JSON, or an option number with --numbered-answers) into category and subcategory names"""
+        result_text = result_text.strip()
+        
+        if self.options.get('numbered_answers'):
+            options, _ = self.build_category_options()
+            match = re.search(r'\d+', result_text)
+            if not match or not 1 <= int(match.group()) <= len(options):
+                self.log(f'Invalid option number. Response: {result_text}', 'ERROR')
+                raise ValueError(f'Invalid option number from LLM: {result_text}')
+            category, subcategory = options[int(match.group()) - 1]
+            return {'category': category, 'subcategory': subcategory}
+        
+        # Try to extract JSON from response
+        # Remove markdown code blocks if present
+        if result_text.startswith('```'):
+            result_text = result_text.split('```')[1]
+            if result_text.startswith('json'):
+                result_text = result_text[4:]
+            result_text = result_text.strip()
+        
+        # Parse JSON
+        try:
+            result = json.loads(result_text)
+        except json.JSONDecodeError as e:
+            self.log(f'JSON decode error: {e}. Response: {result_text}', 'ERROR')
+            raise ValueError(f'Invalid JSON response from LLM: {result_text}')
+        
+        return {
+            'category': result.get('category', '').strip(),
+            'subcategory': result.get('subcategory', '').strip()
+        }
+
+    def classify_product(self, product_name, model='gpt-4o-mini'):
+        """Send product name to ChatGPT and get category/subcategory classification"""
+        if not self.client:
+            raise ValueError('OpenAI client not initialized')
+        
         try:
             response = self.client.chat.completions.create(
                 model=model,
-                messages=[
-                    {
-                        'role': 'system',
-                        'content': 'You are a product classification assistant. Always respond with valid JSON only.'
-                    },
-                    {
-                        'role': 'user',
-                        'content': prompt
-                    }
-                ],
+                messages=self.build_classification_messages(product_name),
                 temperature=0.3,
-                max_tokens=150
+                max_tokens=self.classification_max_tokens()
             )
-            
-            self.stats['api_calls'] += 1
-            result_text = response.choices[0].message.content.strip()
-            
-            # Try to extract JSON from response
-            # Remove markdown code blocks if present
-            if result_text.startswith('```'):
-                result_text = result_text.split('```')[1]
-                if result_text.startswith('json'):
-                    result_text = result_text[4:]
-                result_text = result_text.strip()
-            
-            # Parse JSON
-            result = json.loads(result_text)
-            
-            return {
-                'category': result.get('category', '').strip(),
-                'subcategory': result.get('subcategory', '').strip()
+        except Exception as e:
+            self.log_api_error(e)
+            raise
+        
+        self.stats['api_calls'] += 1
+        return self.parse_classification(response.choices[0].message.content)
+
+    def log_api_error(self, e):
+        """Log an OpenAI API error with the details the API returned"""
+        # Better error handling for OpenAI API errors
+        error_msg = str(e)
+        error_details = {}
+        
+        if hasattr(e, 'response') and hasattr(e.response, 'json'):
+            try:
+                error_data = e.response.json()
+                error_details = error_data
+                if 'error' in error_data:
+                    error_msg = f"Error code: {e.status_code} - {error_data.get('error', {})}"
+            except:
+                error_msg = f"Error code: {e.status_code} - {error_msg}"
+        elif hasattr(e, 'status_code'):
+            error_msg = f"Error code: {e.status_code} - {error_msg}"
+        
+        self.log(f'OpenAI API error: {error_msg}', 'ERROR')
+        if error_details:
+            self.log(f'Error details: {json.dumps(error_details, indent=2)}', 'ERROR')
+
+    def build_group_classification_messages(self, product_names):
+        """Build the chat messages asking the LLM to classify several products at once"""
+        categories_json, categories_text = self.build_categories_prompt()
+        products_text = ''.join(f'{i}. "{name}"\n' for i, name in enumerate(product_names, 1))
+        
+        prompt = f"""You are a product classification assistant. Your task is to classify products into categories and subcategories.
+
+Here is the EXACT JSON structure of available categories and subcategories:
+{categories_json}
+
+Here is a readable list for reference:
+{categories_text}
+
+Products:
+{products_text}
+Please classify each of these {len(product_names)} products by responding with ONLY a JSON object in this exact format,
+with one entry per product in the same order as the list above:
+{{
+    "products": [
+        {{"category": "Category Name", "subcategory": "Subcategory Name"}}
+    ]
+}}
+
+CRITICAL RULES:
+1. You MUST choose from the categories and subcategories in the JSON structure above
+2. Category name must match EXACTLY (case-sensitive) one of the "name" values in the JSON structure
+3. Subcategory name must match EXACTLY (case-sensitive) one of the subcategory strings under the chosen category in the JSON structure
+4. Use the JSON structure as the source of truth - do not invent or modify category/subcategory names
+5. If a product doesn't fit perfectly, choose the closest match from the available options
+6. Return ONLY the JSON object, no additional text, markdown, or explanation
+
+JSON response:"""
+
+        return [
+            {
+                'role': 'system',
+                'content': 'You are a product classification assistant. Always respond with valid JSON only.'
+            },
+            {
+                'role': 'user',
+                'content': prompt
             }
-            
+        ]
+
+    def classify_products_group(self, product_names, model='gpt-4o-mini'):
+        """
+        Classify several products with a single ChatGPT request, sharing the category
+        prompt between them. Returns the classifications in product_names order.
+        """
+        if not self.client:
+            raise ValueError('OpenAI client not initialized')
+        
+        try:
+            response = self.client.chat.completions.create(
+                model=model,
+                messages=self.build_group_classification_messages(product_names),
+                temperature=0.3,
+                max_tokens=150 * len(product_names),
+                response_format={'type': 'json_object'}
+            )
+        except Exception as e:
+            self.log_api_error(e)
+            raise
+        
+        self.stats['api_calls'] += 1
+        result_text = response.choices[0].message.content
+        try:
+            result = json.loads(result_text)
         except json.JSONDecodeError as e:
             self.log(f'JSON decode error: {e}. Response: {result_text}', 'ERROR')
             raise ValueError(f'Invalid JSON response from LLM: {result_text}')
-        except Exception as e:
-            # Better error handling for OpenAI API errors
-            error_msg = str(e)
-            error_details = {}
-            
-            if hasattr(e, 'response') and hasattr(e.response, 'json'):
-                try:
-                    error_data = e.response.json()
-                    error_details = error_data
-                    if 'error' in error_data:
-                        error_msg = f"Error code: {e.status_code} - {error_data.get('error', {})}"
-                except:
-                    error_msg = f"Error code: {e.status_code} - {error_msg}"
-            elif hasattr(e, 'status_code'):
-                error_msg = f"Error code: {e.status_code} - {error_msg}"
-            
-            self.log(f'OpenAI API error: {error_msg}', 'ERROR')
-            if error_details:
-                self.log(f'Error details: {json.dumps(error_details, indent=2)}', 'ERROR')
-            raise
+        
+        classifications = result.get('products') if isinstance(result, dict) else None
+        if not isinstance(classifications, list) or len(classifications) != len(product_names):
+            raise ValueError(f'Expected {len(product_names)} classifications from LLM: {result_text}')
+        
+        return [
+            {
+                'category': (item.get('category') or '').strip(),
+                'subcategory': (item.get('subcategory') or '').strip()
+            }
+            for item in classifications
+        ]
+
+    def find_cached_classification(self, product_name):
+        """
+        Classification of an already classified product with the same name, or the
+        most similar one scoring at least --reuse-similarity; None when there is none.
+        """
+        name = normalize_product_name(product_name)
+        classification = self.classification_cache.get(name)
+        threshold = self.options['reuse_similarity']
+        if classification is None and threshold < 1 and self.cached_names:
+            matches = scored_matches(name, self.cached_names, threshold)
+            if matches:
+                # Earliest classified name wins ties
+                index, _ = max(matches, key=lambda match: (match[1], -match[0]))
+                classification = self.classification_cache[self.cached_names[index]]
+        return classification
+
+    def cache_classification(self, product_name, classification):
+        """Remember an LLM classification for products with the same or a similar name"""
+        name = normalize_product_name(product_name)
+        if name not in self.classification_cache:
+            self.classification_cache[name] = classification
+            self.cached_names.append(name)
+            if self.cache_db is not None:
+                with self.cache_db:
+                    self.cache_db.execute(
+                        'INSERT OR REPLACE INTO classifications VALUES (?, ?, ?, ?, ?)',
+                        (*self.cache_scope, name, classification['category'], classification['subcategory'])
+                    )
+
+    def classify_products_in_batch(self, products, model='gpt-4o-mini'):
+        """
+        Classify all products with a single OpenAI Batch API job instead of one
+        request each. Batches are billed at half price and complete within 24h;
+        this polls until the job ends. Returns the raw answer text by product ID.
+        """
+        if not self.client:
+            raise ValueError('OpenAI client not initialized')
+        if not products:
+            # Everything was cached; the API rejects an empty input file
+            return {}
+        
+        lines = [
+            {
+                'custom_id': str(product.id),
+                'method': 'POST',
+                'url': '/v1/chat/completions',
+                'body': {
+                    'model': model,
+                    'messages': self.build_classification_messages(product.name),
+                    'temperature': 0.3,
+                    'max_tokens': self.classification_max_tokens(),
+                },
+            }
+            for product in products
+        ]
+        payload = dump_json_lines(lines)
+        
+        input_file = self.client.files.create(file=('classify_products.jsonl', payload), purpose='batch')
+        batch = self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint='/v1/chat/completions',
+            completion_window='24h',
+        )
+        # Each batched request is billed like an API call
+        self.stats['api_calls'] += len(lines)
+        self.log(f'Submitted batch {batch.id} with {len(lines)} requests (input file {input_file.id})', 'SUCCESS')
+        
+        while batch.status not in ('completed', 'failed', 'expired', 'cancelled'):
+            time.sleep(self.options['batch_poll_interval'])
+            batch = self.client.batches.retrieve(batch.id)
+            counts = batch.request_counts
+            if counts:
+                self.log(f'Batch {batch.id}: {batch.status} ({counts.completed}/{counts.total} completed, {counts.failed} failed)')
+            else:
+                self.log(f'Batch {batch.id}: {batch.status}')
+        
+        if batch.status != 'completed':
+            raise ValueError(f'Batch {batch.id} ended with status "{batch.status}"')
+        
+        results = {}
+        if batch.output_file_id:
+            output = self.client.files.content(batch.output_file_id).content
+            for line in output.splitlines():
+                if not line.strip():
+                    continue
+                record = loads_json(line)
+                response = record.get('response') or {}
+                if record.get('error') or response.get('status_code') != 200:
+                    self.log(f'  Batch request {record.get("custom_id")} failed: {record.get("error") or response.get("body")}', 'ERROR')
+                    continue
+                results[int(record['custom_id'])] = response['body']['choices'][0]['message']['content']
+        
+        if batch.error_file_id:
+            self.log(f'Batch {batch.id} has failed requests, see file {batch.error_file_id}', 'WARNING')
+        
+        return results
 
     def find_category(self, category_name):
         """Find category by name (case-insensitive, handles variations)"""
@@ -556,6 +912,9 @@ JSON response:"""
         # Log options
         self.log(f'Options: {json.dumps(options, indent=2, default=str)}')
         
+        if options['cache']:
+            self.setup_cache(options.get('cache_file'))
+        
         # Check if categories exist in database
         category_count = Category.objects.filter(parent__isnull=True).count()
         if category_count == 0:
@@ -604,8 +963,32 @@ JSON response:"""
         total_products = queryset.count()
         self.log(f'Total products to process: {total_products}')
         
+        # In batch mode every product is classified up front by one Batch API job,
+        # except those whose name already has a cached classification
+        products = queryset
+        batch_results = None
+        group_size = options['batch_size']
+        group_results = {}
+        if group_size > 1:
+            # Classifying products together needs to look ahead in the list
+            products = list(queryset)
+        if options['batch']:
+            products = list(queryset)
+            try:
+                batch_results = self.classify_products_in_batch(
+                    [p for p in products if self.find_cached_classification(p.name) is None],
+                    options['model']
+                )
+            except Exception as e:
+                self.log(f'Batch classification failed: {e}', 'ERROR')
+                if self.log_file:
+                    self.log_file.close()
+                if self.cache_db is not None:
+                    self.cache_db.close()
+                return
+        
         # Process products
-        for idx, product in enumerate(queryset, 1):
+        for idx, product in enumerate(products, 1):
             self.stats['processed'] += 1
             
             # Update last processed ID (even if it fails, we'll skip it next time)
@@ -615,8 +998,39 @@ JSON response:"""
             
             try:
                 # Classify product
-                self.log(f'  Sending to LLM: {product.name}')
-                classification = self.classify_product(product.name, options['model'])
+                requested = False
+                fresh = False
+                if batch_results is not None and product.id in batch_results:
+                    classification = self.parse_classification(batch_results[product.id])
+                    fresh = True
+                elif product.id in group_results:
+                    # Classified along with an earlier product
+                    classification = group_results.pop(product.id)
+                    fresh = True
+                else:
+                    classification = self.find_cached_classification(product.name)
+                    if classification is not None:
+                        self.stats['reused'] += 1
+                        self.log(f'  Reusing classification of a similar product: {product.name}')
+                    elif batch_results is not None:
+                        raise ValueError('No classification returned by the batch')
+                    elif group_size > 1:
+                        # Send this product with the next ones that still need the LLM
+                        group = [product, *islice(
+                            (p for p in islice(products, idx, None) if self.find_cached_classification(p.name) is None),
+                            group_size - 1
+                        )]
+                        self.log(f'  Sending to LLM with {len(group) - 1} more products: {product.name}')
+                        requested = True
+                        classifications = self.classify_products_group([p.name for p in group], options['model'])
+                        group_results.update(zip((p.id for p in group), classifications))
+                        classification = group_results.pop(product.id)
+                        fresh = True
+                    else:
+                        self.log(f'  Sending to LLM: {product.name}')
+                        requested = True
+                        classification = self.classify_product(product.name, options['model'])
+                        fresh = True
                 
                 category_name = classification.get('category', '')
                 subcategory_name = classification.get('subcategory', '')
@@ -626,13 +1040,16 @@ JSON response:"""
                 # Update product
                 if self.update_product(product, category_name, subcategory_name):
                     self.stats['updated'] += 1
+                    # Only answers that matched the categories are worth reusing
+                    if fresh:
+                        self.cache_classification(product.name, classification)
                     self.log(f'  PRODUCT_UPDATED: category={category_name}, subcategory={subcategory_name or "None"}')
                 else:
                     self.stats['errors'] += 1
                     self.log(f'  PRODUCT_ERROR: Failed to update product', 'ERROR')
                 
                 # Delay between requests
-                if idx < total_products:
+                if requested and idx < total_products:
                     time.sleep(options['delay'])
                     
             except Exception as e:
@@ -663,6 +1080,8 @@ JSON response:"""
         # Close log file
         if self.log_file:
             self.log_file.close()
+        if self.cache_db is not None:
+            self.cache_db.close()
         
         self.stdout.write('')
         self.stdout.write(self.style.SUCCESS('=' * 50))
@@ -672,5 +1091,6 @@ JSON response:"""
         self.stdout.write(f'  Skipped: {self.stats["skipped"]}')
         self.stdout.write(f'  Errors: {self.stats["errors"]}')
         self.stdout.write(f'  API Calls: {self.stats["api_calls"]}')
+        self.stdout.write(f'  Reused: {self.stats["reused"]}')
         self.stdout.write(self.style.SUCCESS('=' * 50))
 
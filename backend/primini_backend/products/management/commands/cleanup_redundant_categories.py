@@ -1,26 +1,28 @@
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import repeat
 from django.core.management.base import BaseCommand
 from django.db import transaction
 from django.db.models import Q, Count
 from primini_backend.products.models import Category, Product
-from difflib import SequenceMatcher
+from primini_backend.products.matching import cluster_similar_names, group_similar_names
 import unicodedata
 
 
+@lru_cache(maxsize=None)
 def normalize_string(s):
-    """Normalize string for comparison (remove accents, lowercase, strip)"""
+    """Normalize string for comparison (remove accents, lowercase, strip); cached per name"""
     if not s:
         return ""
+    # ASCII names have no accents to remove; skip the per-character scan
+    if s.isascii():
+        return s.lower().strip()
     # Remove accents
     s = unicodedata.normalize('NFD', s)
     s = ''.join(c for c in s if unicodedata.category(c) != 'Mn')
     return s.lower().strip()
 
 
-def similarity(a, b):
-    """Calculate similarity between two strings (0-1)"""
-    return SequenceMatcher(None, normalize_string(a), normalize_string(b)).ratio()
-
-
 class Command(BaseCommand):
     help = 'Remove redundant categories and subcategories by merging duplicates'
 
@@ -41,8 +43,19 @@ class Command(BaseCommand):
             action='store_true',
             help='Automatically merge categories without confirmation',
         )
+        parser.add_argument(
+            '--transitive',
+            action='store_true',
+            help='Group categories linked through a chain of similar names, not only names similar to the first one',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Number of processes comparing categories of different parents (default: 1)',
+        )
 
-    def find_duplicate_categories(self, threshold=0.85):
+    def find_duplicate_categories(self, threshold=0.85, workers=1, transitive=False):
         """Find duplicate categories based on name similarity and same parent"""
         duplicates = []
         categories = Category.objects.all().order_by('parent_id', 'name')
@@ -55,32 +68,27 @@ class Command(BaseCommand):
                 parent_groups[parent_id] = []
             parent_groups[parent_id].append(cat)
         
-        processed = set()
-        
-        for parent_id, cats in parent_groups.items():
-            for i, cat1 in enumerate(cats):
-                if cat1.id in processed:
-                    continue
-                
-                similar = [cat1]
-                for cat2 in cats[i+1:]:
-                    if cat2.id in processed:
-                        continue
-                    
-                    # Check similarity
-                    sim = similarity(cat1.name, cat2.name)
-                    if sim >= threshold:
-                        similar.append(cat2)
-                        processed.add(cat2.id)
-                
-                if len(similar) > 1:
-                    # Choose the one with more products as the main category
-                    similar.sort(key=lambda c: (
-                        c.products.count() + c.subcategory_products.count(),
-                        -c.id  # Prefer newer (higher ID) if same product count
-                    ), reverse=True)
-                    duplicates.append(similar)
-                    processed.add(cat1.id)
+        # Buckets never share a category, so they can be compared in separate processes
+        buckets = list(parent_groups.values())
+        bucket_names = [[normalize_string(cat.name) for cat in cats] for cats in buckets]
+        group_names = cluster_similar_names if transitive else group_similar_names
+        if workers > 1 and len(buckets) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                bucket_groups = list(executor.map(
+                    group_names, bucket_names, repeat(threshold), chunksize=8
+                ))
+        else:
+            bucket_groups = [group_names(names, threshold) for names in bucket_names]
+        
+        for cats, groups in zip(buckets, bucket_groups):
+            for group in groups:
+                similar = [cats[i] for i in group]
+                # Choose the one with more products as the main category
+                similar.sort(key=lambda c: (
+                    c.products.count() + c.subcategory_products.count(),
+                    -c.id  # Prefer newer (higher ID) if same product count
+                ), reverse=True)
+                duplicates.append(similar)
         
         return duplicates
 
@@ -142,6 +150,8 @@ class Command(BaseCommand):
         dry_run = options['dry_run']
         threshold = options['similarity_threshold']
         auto_merge = options['auto_merge']
+        transitive = options['transitive']
+        workers = options['workers']
         
         self.stdout.write(self.style.SUCCESS('=' * 70))
         self.stdout.write(self.style.SUCCESS('Category Cleanup Tool'))
@@ -152,7 +162,7 @@ class Command(BaseCommand):
         
         # Step 1: Find duplicate categories
         self.stdout.write('\n📋 Step 1: Finding duplicate categories...')
-        duplicates = self.find_duplicate_categories(threshold)
+        duplicates = self.find_duplicate_categories(threshold, workers, transitive)
         
         if duplicates:
             self.stdout.write(f'\nFound {len(duplicates)} groups of duplicate categories:')
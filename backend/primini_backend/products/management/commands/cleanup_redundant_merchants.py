@@ -1,26 +1,26 @@
+from functools import lru_cache
 from django.core.management.base import BaseCommand
 from django.db import transaction
 from django.db.models import Count
-from primini_backend.products.models import Merchant, PriceOffer
-from difflib import SequenceMatcher
+from primini_backend.products.models import Merchant
+from primini_backend.products.matching import cluster_similar_names, group_similar_names
 import unicodedata
 
 
+@lru_cache(maxsize=None)
 def normalize_string(s):
-    """Normalize string for comparison (remove accents, lowercase, strip)"""
+    """Normalize string for comparison (remove accents, lowercase, strip); cached per name"""
     if not s:
         return ""
+    # ASCII names have no accents to remove; skip the per-character scan
+    if s.isascii():
+        return s.lower().strip()
     # Remove accents
     s = unicodedata.normalize('NFD', s)
     s = ''.join(c for c in s if unicodedata.category(c) != 'Mn')
     return s.lower().strip()
 
 
-def similarity(a, b):
-    """Calculate similarity between two strings (0-1)"""
-    return SequenceMatcher(None, normalize_string(a), normalize_string(b)).ratio()
-
-
 class Command(BaseCommand):
     help = 'Remove redundant merchants by merging duplicates'
 
@@ -41,39 +41,29 @@ class Command(BaseCommand):
             action='store_true',
             help='Automatically merge merchants without confirmation',
         )
+        parser.add_argument(
+            '--transitive',
+            action='store_true',
+            help='Group merchants linked through a chain of similar names, not only names similar to the first one',
+        )
 
-    def find_duplicate_merchants(self, threshold=0.85):
+    def find_duplicate_merchants(self, threshold=0.85, transitive=False):
         """Find duplicate merchants based on name similarity"""
         duplicates = []
-        merchants = Merchant.objects.annotate(
+        merchants = list(Merchant.objects.annotate(
             offer_count=Count('offers')
-        ).order_by('name')
+        ).order_by('name'))
+        names = [normalize_string(merchant.name) for merchant in merchants]
         
-        processed = set()
-        
-        for i, merchant1 in enumerate(merchants):
-            if merchant1.id in processed:
-                continue
-            
-            similar = [merchant1]
-            for merchant2 in merchants[i+1:]:
-                if merchant2.id in processed:
-                    continue
-                
-                # Check similarity
-                sim = similarity(merchant1.name, merchant2.name)
-                if sim >= threshold:
-                    similar.append(merchant2)
-                    processed.add(merchant2.id)
-            
-            if len(similar) > 1:
-                # Choose the one with more offers as the main merchant
-                similar.sort(key=lambda m: (
-                    m.offer_count,
-                    -m.id  # Prefer newer (higher ID) if same offer count
-                ), reverse=True)
-                duplicates.append(similar)
-                processed.add(merchant1.id)
+        group_names = cluster_similar_names if transitive else group_similar_names
+        for group in group_names(names, threshold):
+            similar = [merchants[i] for i in group]
+            # Choose the one with more offers as the main merchant
+            similar.sort(key=lambda m: (
+                m.offer_count,
+                -m.id  # Prefer newer (higher ID) if same offer count
+            ), reverse=True)
+            duplicates.append(similar)
         
         return duplicates
 
@@ -87,6 +77,10 @@ class Command(BaseCommand):
         
         self.stdout.write(f'\n  Merging into: {main.name} (ID: {main.id})')
         
+        # Main merchant's offers by product (one per product), loaded once and kept
+        # current as offers move so each conflict check is a dict lookup
+        main_offers = {} if dry_run else {offer.product_id: offer for offer in main.offers.all()}
+        
         for redundant_merchant in redundant:
             self.stdout.write(f'    - {redundant_merchant.name} (ID: {redundant_merchant.id})')
             
@@ -102,10 +96,7 @@ class Command(BaseCommand):
                 
                 for offer in offers:
                     # Check if main merchant already has an offer for this product
-                    existing_offer = PriceOffer.objects.filter(
-                        product=offer.product,
-                        merchant=main
-                    ).first()
+                    existing_offer = main_offers.get(offer.product_id)
                     
                     if existing_offer:
                         # Keep the one with better price (lower) or more recent
@@ -127,6 +118,7 @@ class Command(BaseCommand):
                         # No conflict, can safely move
                         offer.merchant = main
                         offer.save()
+                        main_offers[offer.product_id] = offer
                         moved_count += 1
                 
                 # Update main merchant info if redundant has better data
@@ -163,6 +155,7 @@ class Command(BaseCommand):
         dry_run = options['dry_run']
         threshold = options['similarity_threshold']
         auto_merge = options['auto_merge']
+        transitive = options['transitive']
         
         self.stdout.write(self.style.SUCCESS('=' * 70))
         self.stdout.write(self.style.SUCCESS('Merchant Cleanup Tool'))
@@ -173,7 +166,7 @@ class Command(BaseCommand):
         
         # Step 1: Find duplicate merchants
         self.stdout.write('\n📋 Step 1: Finding duplicate merchants...')
-        duplicates = self.find_duplicate_merchants(threshold)
+        duplicates = self.find_duplicate_merchants(threshold, transitive)
         
         if duplicates:
             self.stdout.write(f'\nFound {len(duplicates)} groups of duplicate merchants:')
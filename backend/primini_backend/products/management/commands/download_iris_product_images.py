@@ -22,6 +22,10 @@ import requests
 import urllib3
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+# Compiled once; IRIS URLs carry the product/image id as "/<id>-..." (images also "/<id>_...")
+PRODUCT_ID_RE = re.compile(r'/(\d+)-')
+IMAGE_ID_RE = re.compile(r'/(\d+)[-_]')
+
 
 class Command(BaseCommand):
     help = 'Download product images from IRIS product pages using raw_url_map'
@@ -62,8 +66,7 @@ class Command(BaseCommand):
             
             # Extract product ID from URL if not provided
             if not product_id:
-                import re
-                match = re.search(r'/(\d+)-', url)
+                match = PRODUCT_ID_RE.search(url)
                 if match:
                     product_id = match.group(1)
             
@@ -171,8 +174,7 @@ class Command(BaseCommand):
                     # Also include large_default and listing images (these are product images)
                     elif 'large_default' in img_url or 'listing' in img_url or 'home_default' in img_url:
                         # Extract ID from URL to check
-                        import re
-                        match = re.search(r'/(\d+)[-_]', img_url)
+                        match = IMAGE_ID_RE.search(img_url)
                         if match:
                             img_id = match.group(1)
                             # If the image ID is close to product ID (within 1000), likely same product
@@ -411,8 +413,7 @@ class Command(BaseCommand):
                         # Extract image URLs from page
                         self.stdout.write(f'  📥 Scraping page for images...')
                         # Extract product ID from URL for filtering
-                        import re
-                        product_id_match = re.search(r'/(\d+)-', iris_url)
+                        product_id_match = PRODUCT_ID_RE.search(iris_url)
                         product_id = product_id_match.group(1) if product_id_match else None
                         
                         # Retry logic for browser crashes
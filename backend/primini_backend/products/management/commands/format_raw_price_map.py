@@ -3,6 +3,12 @@ from django.db import transaction
 from primini_backend.products.models import Product
 import re
 
+# Compiled once; parse_price_to_int runs for every price of every product
+# Currency symbols/text and (non-breaking) spaces, removed in a single pass
+PRICE_NOISE_RE = re.compile(r'MAD|DH|TTC|€|\$| |\u00a0')
+PRICE_NUMBER_RE = re.compile(r'[\d\s\.]+')
+NON_DIGIT_RE = re.compile(r'[^\d]')
+
 
 def parse_price_to_int(price_value):
     """Convert price value to integer, handling various formats correctly"""
@@ -19,12 +25,8 @@ def parse_price_to_int(price_value):
     
     # If it's a string, try to extract number
     if isinstance(price_value, str):
-        # Remove common currency symbols and text
-        price_str = price_value.replace('MAD', '').replace('DH', '').replace('TTC', '').replace('€', '').replace('$', '')
-        price_str = price_str.strip()
-        
-        # Remove all spaces (including non-breaking spaces)
-        price_str = price_str.replace(' ', '').replace('\u00a0', '').replace('\xa0', '')
+        # Remove common currency symbols and text and all spaces (including non-breaking spaces)
+        price_str = PRICE_NOISE_RE.sub('', price_value).strip()
         
         # Handle European number format
         # Examples: 
@@ -75,7 +77,7 @@ def parse_price_to_int(price_value):
         # Fallback: try to extract number pattern
         # Look for number with optional thousands separators
         # Pattern: digits with optional dots/spaces as separators
-        match = re.search(r'[\d\s\.]+', price_str)
+        match = PRICE_NUMBER_RE.search(price_str)
         if match:
             num_str = match.group().replace(' ', '').replace('.', '')
             try:
@@ -89,7 +91,7 @@ def parse_price_to_int(price_value):
         if ',' in price_str:
             # Take only digits before comma
             before_comma = price_str.split(',')[0]
-            digits = re.sub(r'[^\d]', '', before_comma)
+            digits = NON_DIGIT_RE.sub('', before_comma)
             if digits:
                 try:
                     return int(digits)
@@ -97,7 +99,7 @@ def parse_price_to_int(price_value):
                     pass
         else:
             # No comma, extract all digits
-            digits = re.sub(r'[^\d]', '', price_str)
+            digits = NON_DIGIT_RE.sub('', price_str)
             if digits:
                 try:
                     return int(digits)
@@ -112,13 +114,9 @@ def format_price_value(price_value):
     if price_value is None:
         return None
     
-    # If it's a list/array, format each element
+    # If it's a list/array, format each element (built in one comprehension, no per-item append calls)
     if isinstance(price_value, list):
-        formatted_list = []
-        for item in price_value:
-            formatted = parse_price_to_int(item)
-            if formatted is not None:
-                formatted_list.append(formatted)
+        formatted_list = [formatted for formatted in map(parse_price_to_int, price_value) if formatted is not None]
         return formatted_list if formatted_list else None
     
     # Single value
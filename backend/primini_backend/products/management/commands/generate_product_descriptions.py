@@ -9,12 +9,15 @@ This command:
 5. Generates detailed logs of the process
 """
 
+import asyncio
 import json
 import os
 import time
+from collections import deque
 from datetime import datetime
 from pathlib import Path
 
+from asgiref.sync import sync_to_async
 from django.core.management.base import BaseCommand
 from django.db import transaction
 from django.conf import settings
@@ -23,11 +26,87 @@ from primini_backend.products.models import Product
 
 # Try to import OpenAI
 try:
-    from openai import OpenAI
+    from openai import AsyncOpenAI, OpenAI
     OPENAI_AVAILABLE = True
 except ImportError:
     OPENAI_AVAILABLE = False
 
+# Product types recognized from category, subcategory and product name, tried in order.
+# Built once at import; each entry is (terms, guidance) and terms match as substrings.
+PRODUCT_TYPE_GUIDANCE = (
+    (
+        ('smartphone', 'téléphonie', 'tablette', 'tablet', 'phone', 'mobile'),
+        {
+            'type': 'smartphone_tablette',
+            'sections': 'Écran, Appareil photo, Processeur, Mémoire, Stockage, Batterie, Dimensions, Authentification biométrique, Connectivité, Autres fonctionnalités',
+            'guidance': 'Inclus les détails de l\'écran (taille, résolution, technologie), caméras (MP, ouverture, zoom), processeur (modèle, fréquence), RAM, stockage, batterie (capacité, charge rapide), dimensions, empreinte digitale/facial, 5G/WiFi/Bluetooth, résistance à l\'eau, etc.'
+        },
+    ),
+    (
+        ('ordinateur', 'laptop', 'pc', 'computer', 'portable', 'desktop'),
+        {
+            'type': 'ordinateur',
+            'sections': 'Processeur, RAM, Stockage, Écran, Carte graphique, Batterie, Dimensions, Ports et connectivité, Clavier et trackpad, Autres caractéristiques',
+            'guidance': 'Inclus le modèle de processeur (Intel/AMD, génération, nombre de cœurs), quantité de RAM, type et capacité de stockage (SSD/HDD), taille et résolution d\'écran, carte graphique dédiée/intégrée, autonomie batterie, poids, ports USB/HDMI/Thunderbolt, etc.'
+        },
+    ),
+    (
+        ('électroménager', 'aspirateur', 'machine à laver', 'réfrigérateur', 'four', 'lave-vaisselle', 'climatiseur'),
+        {
+            'type': 'electromenager',
+            'sections': 'Capacité, Puissance, Dimensions, Fonctions et programmes, Consommation énergétique, Niveau sonore, Matériaux et finition, Autres caractéristiques',
+            'guidance': 'Inclus la capacité (litres/kg), puissance (watts), dimensions (largeur x profondeur x hauteur), programmes et fonctions disponibles, classe énergétique, niveau sonore en dB, matériaux utilisés, certifications, etc.'
+        },
+    ),
+    (
+        ('écouteur', 'casque', 'haut-parleur', 'audio', 'son', 'microphone', 'téléviseur', 'tv'),
+        {
+            'type': 'audio_video',
+            'sections': 'Puissance et qualité audio, Connectivité, Dimensions et poids, Batterie (si applicable), Fonctions spéciales, Autres caractéristiques',
+            'guidance': 'Inclus la puissance (watts), qualité audio (fréquences, drivers), connectivité (Bluetooth, filaire, NFC), dimensions, autonomie batterie pour appareils portables, fonctions (réduction de bruit, égaliseur), compatibilité, etc.'
+        },
+    ),
+    (
+        ('appareil photo', 'caméra', 'objectif', 'photo'),
+        {
+            'type': 'photo',
+            'sections': 'Capteur, Objectif, Vidéo, Dimensions et poids, Connectivité, Batterie, Autres caractéristiques',
+            'guidance': 'Inclus la taille du capteur (MP, type), objectif (focale, ouverture), capacités vidéo (résolution, fps), dimensions, poids, connectivité WiFi/Bluetooth, autonomie, stabilisation, etc.'
+        },
+    ),
+    (
+        ('composant', 'processeur', 'carte graphique', 'ram', 'stockage', 'ssd', 'disque'),
+        {
+            'type': 'composant',
+            'sections': 'Spécifications techniques, Performances, Compatibilité, Dimensions, Consommation, Autres caractéristiques',
+            'guidance': 'Inclus les spécifications détaillées (fréquence, capacité, interface), performances attendues, compatibilité (socket, format), dimensions physiques, consommation énergétique, garantie, etc.'
+        },
+    ),
+    (
+        ('accessoire', 'câble', 'chargeur', 'coque', 'étui', 'support'),
+        {
+            'type': 'accessoire',
+            'sections': 'Matériaux, Dimensions, Compatibilité, Fonctions, Autres caractéristiques',
+            'guidance': 'Inclus les matériaux de construction, dimensions précises, compatibilité avec les modèles/appareils, fonctions spéciales, certifications, etc.'
+        },
+    ),
+    (
+        ('santé', 'beauté', 'parfum', 'maquillage', 'soin'),
+        {
+            'type': 'sante_beaute',
+            'sections': 'Composition, Volume/Quantité, Utilisation, Ingrédients actifs, Type de peau, Autres caractéristiques',
+            'guidance': 'Inclus la composition, volume ou quantité, mode d\'utilisation, ingrédients actifs, type de peau ciblé, certifications (bio, hypoallergénique), etc.'
+        },
+    ),
+)
+
+# Default guidance for unknown product types
+DEFAULT_PRODUCT_TYPE_GUIDANCE = {
+    'type': 'general',
+    'sections': 'Caractéristiques principales, Spécifications techniques, Dimensions, Fonctions, Autres caractéristiques',
+    'guidance': 'Inclus toutes les caractéristiques techniques pertinentes, spécifications détaillées, dimensions, fonctions principales, et toute autre information importante pour ce type de produit.'
+}
+
 
 class Command(BaseCommand):
     help = 'Generate detailed product descriptions with technical specs using ChatGPT'
@@ -45,6 +124,7 @@ class Command(BaseCommand):
         self.resume_file = None
         self.last_processed_id = None
         self.client = None
+        self.async_client = None
         self.options = {}
 
     def setup_logging(self, resume_file_path=None):
@@ -103,7 +183,12 @@ class Command(BaseCommand):
         if not api_key.startswith('sk-'):
             self.log(f'WARNING: API key format looks incorrect (should start with sk-)', 'WARNING')
         
-        self.client = OpenAI(api_key=api_key)
+        # The clients retry rate limits, timeouts and server errors themselves, with
+        # jittered exponential backoff that honours the Retry-After header
+        max_retries = self.options.get('max_retries', 2)
+        self.client = OpenAI(api_key=api_key, max_retries=max_retries)
+        if self.options.get('concurrency', 1) > 1:
+            self.async_client = AsyncOpenAI(api_key=api_key, max_retries=max_retries)
         
         # Test the API key with a simple request
         try:
@@ -132,71 +217,15 @@ class Command(BaseCommand):
         category_name = product.category.name.lower() if product.category else ""
         subcategory_name = product.subcategory.name.lower() if product.subcategory else ""
         product_name_lower = product.name.lower()
+        # Terms never contain a newline, so one scan of the joined text matches
+        # exactly when one of the three names contains the term
+        searched_text = '\n'.join((category_name, subcategory_name, product_name_lower))
         
         # Determine product type based on category and subcategory
-        if any(term in category_name or term in subcategory_name or term in product_name_lower 
-               for term in ['smartphone', 'téléphonie', 'tablette', 'tablet', 'phone', 'mobile']):
-            return {
-                'type': 'smartphone_tablette',
-                'sections': 'Écran, Appareil photo, Processeur, Mémoire, Stockage, Batterie, Dimensions, Authentification biométrique, Connectivité, Autres fonctionnalités',
-                'guidance': 'Inclus les détails de l\'écran (taille, résolution, technologie), caméras (MP, ouverture, zoom), processeur (modèle, fréquence), RAM, stockage, batterie (capacité, charge rapide), dimensions, empreinte digitale/facial, 5G/WiFi/Bluetooth, résistance à l\'eau, etc.'
-            }
-        elif any(term in category_name or term in subcategory_name or term in product_name_lower 
-                 for term in ['ordinateur', 'laptop', 'pc', 'computer', 'portable', 'desktop']):
-            return {
-                'type': 'ordinateur',
-                'sections': 'Processeur, RAM, Stockage, Écran, Carte graphique, Batterie, Dimensions, Ports et connectivité, Clavier et trackpad, Autres caractéristiques',
-                'guidance': 'Inclus le modèle de processeur (Intel/AMD, génération, nombre de cœurs), quantité de RAM, type et capacité de stockage (SSD/HDD), taille et résolution d\'écran, carte graphique dédiée/intégrée, autonomie batterie, poids, ports USB/HDMI/Thunderbolt, etc.'
-            }
-        elif any(term in category_name or term in subcategory_name or term in product_name_lower 
-                 for term in ['électroménager', 'aspirateur', 'machine à laver', 'réfrigérateur', 'four', 'lave-vaisselle', 'climatiseur']):
-            return {
-                'type': 'electromenager',
-                'sections': 'Capacité, Puissance, Dimensions, Fonctions et programmes, Consommation énergétique, Niveau sonore, Matériaux et finition, Autres caractéristiques',
-                'guidance': 'Inclus la capacité (litres/kg), puissance (watts), dimensions (largeur x profondeur x hauteur), programmes et fonctions disponibles, classe énergétique, niveau sonore en dB, matériaux utilisés, certifications, etc.'
-            }
-        elif any(term in category_name or term in subcategory_name or term in product_name_lower 
-                 for term in ['écouteur', 'casque', 'haut-parleur', 'audio', 'son', 'microphone', 'téléviseur', 'tv']):
-            return {
-                'type': 'audio_video',
-                'sections': 'Puissance et qualité audio, Connectivité, Dimensions et poids, Batterie (si applicable), Fonctions spéciales, Autres caractéristiques',
-                'guidance': 'Inclus la puissance (watts), qualité audio (fréquences, drivers), connectivité (Bluetooth, filaire, NFC), dimensions, autonomie batterie pour appareils portables, fonctions (réduction de bruit, égaliseur), compatibilité, etc.'
-            }
-        elif any(term in category_name or term in subcategory_name or term in product_name_lower 
-                 for term in ['appareil photo', 'caméra', 'objectif', 'photo']):
-            return {
-                'type': 'photo',
-                'sections': 'Capteur, Objectif, Vidéo, Dimensions et poids, Connectivité, Batterie, Autres caractéristiques',
-                'guidance': 'Inclus la taille du capteur (MP, type), objectif (focale, ouverture), capacités vidéo (résolution, fps), dimensions, poids, connectivité WiFi/Bluetooth, autonomie, stabilisation, etc.'
-            }
-        elif any(term in category_name or term in subcategory_name or term in product_name_lower 
-                 for term in ['composant', 'processeur', 'carte graphique', 'ram', 'stockage', 'ssd', 'disque']):
-            return {
-                'type': 'composant',
-                'sections': 'Spécifications techniques, Performances, Compatibilité, Dimensions, Consommation, Autres caractéristiques',
-                'guidance': 'Inclus les spécifications détaillées (fréquence, capacité, interface), performances attendues, compatibilité (socket, format), dimensions physiques, consommation énergétique, garantie, etc.'
-            }
-        elif any(term in category_name or term in subcategory_name or term in product_name_lower 
-                 for term in ['accessoire', 'câble', 'chargeur', 'coque', 'étui', 'support']):
-            return {
-                'type': 'accessoire',
-                'sections': 'Matériaux, Dimensions, Compatibilité, Fonctions, Autres caractéristiques',
-                'guidance': 'Inclus les matériaux de construction, dimensions précises, compatibilité avec les modèles/appareils, fonctions spéciales, certifications, etc.'
-            }
-        elif any(term in category_name or term in subcategory_name or term in product_name_lower 
-                 for term in ['santé', 'beauté', 'parfum', 'maquillage', 'soin']):
-            return {
-                'type': 'sante_beaute',
-                'sections': 'Composition, Volume/Quantité, Utilisation, Ingrédients actifs, Type de peau, Autres caractéristiques',
-                'guidance': 'Inclus la composition, volume ou quantité, mode d\'utilisation, ingrédients actifs, type de peau ciblé, certifications (bio, hypoallergénique), etc.'
-            }
-        else:
-            # Default guidance for unknown product types
-            return {
-                'type': 'general',
-                'sections': 'Caractéristiques principales, Spécifications techniques, Dimensions, Fonctions, Autres caractéristiques',
-                'guidance': 'Inclus toutes les caractéristiques techniques pertinentes, spécifications détaillées, dimensions, fonctions principales, et toute autre information importante pour ce type de produit.'
-            }
+        for terms, guidance in PRODUCT_TYPE_GUIDANCE:
+            if any(term in searched_text for term in terms):
+                return guidance
+        return DEFAULT_PRODUCT_TYPE_GUIDANCE
 
     def build_description_prompt(self, product):
         """Build the prompt for generating product description"""
@@ -249,64 +278,149 @@ Génère maintenant la description complète et détaillée du produit en franç
 
         return prompt
 
+    def start_description_request(self, product):
+        """Log the request for a product and return the chat messages to send"""
+        prompt = self.build_description_prompt(product)
+        
+        self.log(f'PRODUCT_START: ID={product.id}, Name="{product.name}", Category={product.category.name if product.category else "None"}, Brand={product.brand or "None"}')
+        self.log(f'PROMPT: {prompt[:500]}...' if len(prompt) > 500 else f'PROMPT: {prompt}')
+        
+        self.stats['api_calls'] += 1
+        return [
+            {
+                "role": "system",
+                "content": "Tu es un expert en rédaction de descriptions techniques de produits électroniques et électroménagers. Tu génères des descriptions détaillées, précises et bien structurées en français."
+            },
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ]
+
+    def read_description(self, product, response, elapsed_time):
+        """Extract and log the generated description from an OpenAI response"""
+        if not response.choices or not response.choices[0].message.content:
+            self.log(f'PRODUCT_ERROR: ID={product.id}, Error="No response from OpenAI"', 'ERROR')
+            return None
+        
+        description = response.choices[0].message.content.strip()
+        description_length = len(description)
+        
+        # Log response details
+        usage = response.usage
+        self.log(f'API_RESPONSE: ID={product.id}, Tokens={usage.total_tokens if usage else "N/A"}, Prompt_tokens={usage.prompt_tokens if usage else "N/A"}, Completion_tokens={usage.completion_tokens if usage else "N/A"}, Time={elapsed_time:.2f}s')
+        self.log(f'DESCRIPTION_GENERATED: ID={product.id}, Length={description_length} characters')
+        self.log(f'DESCRIPTION_PREVIEW: {description[:200]}...' if description_length > 200 else f'DESCRIPTION_PREVIEW: {description}')
+        
+        return description
+
+    def log_product_error(self, product, e):
+        """Log an OpenAI or processing error for a product"""
+        error_msg = str(e)
+        if hasattr(e, 'response') and hasattr(e.response, 'json'):
+            error_data = e.response.json()
+            error_msg = f"Error code: {e.status_code} - {error_data}"
+        elif hasattr(e, 'status_code'):
+            error_msg = f"Error code: {e.status_code} - {error_msg}"
+        
+        self.log(f'PRODUCT_ERROR: ID={product.id}, Error="{error_msg}"', 'ERROR')
+
     def generate_description(self, product):
         """Generate product description using OpenAI"""
         if not self.client:
             raise ValueError('OpenAI client not initialized')
         
         try:
-            prompt = self.build_description_prompt(product)
-            
-            self.log(f'PRODUCT_START: ID={product.id}, Name="{product.name}", Category={product.category.name if product.category else "None"}, Brand={product.brand or "None"}')
-            self.log(f'PROMPT: {prompt[:500]}...' if len(prompt) > 500 else f'PROMPT: {prompt}')
-            
-            self.stats['api_calls'] += 1
+            messages = self.start_description_request(product)
             start_time = time.time()
             
             response = self.client.chat.completions.create(
                 model="gpt-4o",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "Tu es un expert en rédaction de descriptions techniques de produits électroniques et électroménagers. Tu génères des descriptions détaillées, précises et bien structurées en français."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
+                messages=messages,
                 temperature=0.3,
                 max_tokens=2000,
             )
             
-            elapsed_time = time.time() - start_time
+            return self.read_description(product, response, time.time() - start_time)
             
-            if not response.choices or not response.choices[0].message.content:
-                self.log(f'PRODUCT_ERROR: ID={product.id}, Error="No response from OpenAI"', 'ERROR')
-                return None
-            
-            description = response.choices[0].message.content.strip()
-            description_length = len(description)
+        except Exception as e:
+            self.log_product_error(product, e)
+            return None
+
+    async def generate_description_async(self, product):
+        """Generate product description using the AsyncOpenAI client"""
+        try:
+            messages = self.start_description_request(product)
+            start_time = time.time()
             
-            # Log response details
-            usage = response.usage
-            self.log(f'API_RESPONSE: ID={product.id}, Tokens={usage.total_tokens if usage else "N/A"}, Prompt_tokens={usage.prompt_tokens if usage else "N/A"}, Completion_tokens={usage.completion_tokens if usage else "N/A"}, Time={elapsed_time:.2f}s')
-            self.log(f'DESCRIPTION_GENERATED: ID={product.id}, Length={description_length} characters')
-            self.log(f'DESCRIPTION_PREVIEW: {description[:200]}...' if description_length > 200 else f'DESCRIPTION_PREVIEW: {description}')
+            response = await self.async_client.chat.completions.create(
+                model="gpt-4o",
+                messages=messages,
+                temperature=0.3,
+                max_tokens=2000,
+            )
             
-            return description
+            return self.read_description(product, response, time.time() - start_time)
             
         except Exception as e:
-            error_msg = str(e)
-            if hasattr(e, 'response') and hasattr(e.response, 'json'):
-                error_data = e.response.json()
-                error_msg = f"Error code: {e.status_code} - {error_data}"
-            elif hasattr(e, 'status_code'):
-                error_msg = f"Error code: {e.status_code} - {error_msg}"
-            
-            self.log(f'PRODUCT_ERROR: ID={product.id}, Error="{error_msg}"', 'ERROR')
+            self.log_product_error(product, e)
             return None
 
+    def save_description(self, product, description):
+        """Store a generated description on the product"""
+        with transaction.atomic():
+            product.description = description
+            product.save(update_fields=['description'])
+        
+        self.log(f'PRODUCT_SUCCESS: ID={product.id}, Description saved ({len(description)} characters)', 'SUCCESS')
+        self.stats['updated'] += 1
+
+    async def generate_descriptions_concurrently(self, products, concurrency, delay):
+        """
+        Generate descriptions with up to `concurrency` OpenAI requests in flight,
+        starting at most one request every `delay` seconds. Descriptions are saved
+        as they arrive; the resume state only moves past a product once every
+        product before it is done, so --resume never skips unfinished work.
+        """
+        total_products = len(products)
+        semaphore = asyncio.Semaphore(concurrency)
+        pacing = asyncio.Lock()
+        loop = asyncio.get_running_loop()
+        next_start = loop.time()
+        pending_ids = deque(product.id for product in products)
+        done_ids = set()
+        save_description = sync_to_async(self.save_description)
+        
+        async def process(index, product):
+            nonlocal next_start
+            async with semaphore:
+                # Space request starts to respect rate limits
+                async with pacing:
+                    wait = next_start - loop.time()
+                    if wait > 0:
+                        await asyncio.sleep(wait)
+                    next_start = loop.time() + delay
+                
+                self.log(f'\n[{index}/{total_products}] Processing product ID {product.id}: {product.name}')
+                self.stats['processed'] += 1
+                description = await self.generate_description_async(product)
+            
+            try:
+                if description:
+                    await save_description(product, description)
+                else:
+                    self.log(f'PRODUCT_FAILED: ID={product.id}, Failed to generate description', 'WARNING')
+                    self.stats['errors'] += 1
+            except Exception as e:
+                self.log_product_error(product, e)
+                self.stats['errors'] += 1
+            
+            done_ids.add(product.id)
+            while pending_ids and pending_ids[0] in done_ids:
+                self.save_resume_state(pending_ids.popleft())
+        
+        await asyncio.gather(*(process(index, product) for index, product in enumerate(products, 1)))
+
     def load_resume_state(self):
         """Load the last processed product ID from resume file"""
         if self.resume_file and self.resume_file.exists():
@@ -360,11 +474,23 @@ Génère maintenant la description complète et détaillée du produit en franç
             default=1.0,
             help='Delay between API calls in seconds (default: 1.0)'
         )
+        parser.add_argument(
+            '--max-retries',
+            type=int,
+            default=2,
+            help='Retries of a failed API call (rate limits, timeouts, server errors) with exponential backoff (default: 2)'
+        )
         parser.add_argument(
             '--limit',
             type=int,
             help='Limit the number of products to process'
         )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=1,
+            help='Number of OpenAI requests in flight at once; --delay still spaces their starts (default: 1, sequential)'
+        )
         parser.add_argument(
             '--resume-file',
             type=str,
@@ -396,7 +522,8 @@ Génère maintenant la description complète et détaillée du produit en franç
             return
         
         # Get products to process
-        products = Product.objects.all().order_by('id')
+        # The prompt reads category and subcategory, so fetch them with the product
+        products = Product.objects.select_related('category', 'subcategory').order_by('id')
         
         if options.get('skip_existing'):
             # Skip products that already have descriptions
@@ -424,42 +551,34 @@ Génère maintenant la description complète et détaillée du produit en franç
         self.log(f'Options: delay={options.get("delay", 1.0)}s, skip_existing={options.get("skip_existing", False)}, limit={options.get("limit", "None")}')
         
         delay = options.get('delay', 1.0)
+        concurrency = options.get('concurrency', 1)
         
-        for index, product in enumerate(products, 1):
-            self.log(f'\n[{index}/{total_products}] Processing product ID {product.id}: {product.name}')
-            self.stats['processed'] += 1
-            
-            try:
-                description = self.generate_description(product)
+        if concurrency > 1:
+            asyncio.run(self.generate_descriptions_concurrently(list(products), concurrency, delay))
+        else:
+            for index, product in enumerate(products, 1):
+                self.log(f'\n[{index}/{total_products}] Processing product ID {product.id}: {product.name}')
+                self.stats['processed'] += 1
                 
-                if description:
-                    with transaction.atomic():
-                        product.description = description
-                        product.save(update_fields=['description'])
+                try:
+                    description = self.generate_description(product)
                     
-                    self.log(f'PRODUCT_SUCCESS: ID={product.id}, Description saved ({len(description)} characters)', 'SUCCESS')
-                    self.stats['updated'] += 1
-                else:
-                    self.log(f'PRODUCT_FAILED: ID={product.id}, Failed to generate description', 'WARNING')
-                    self.stats['errors'] += 1
-                
-                # Save resume state
-                self.save_resume_state(product.id)
-                
-                # Delay between requests to respect rate limits
-                if index < total_products:
-                    time.sleep(delay)
+                    if description:
+                        self.save_description(product, description)
+                    else:
+                        self.log(f'PRODUCT_FAILED: ID={product.id}, Failed to generate description', 'WARNING')
+                        self.stats['errors'] += 1
                     
-            except Exception as e:
-                error_msg = str(e)
-                if hasattr(e, 'response') and hasattr(e.response, 'json'):
-                    error_data = e.response.json()
-                    error_msg = f"Error code: {e.status_code} - {error_data}"
-                elif hasattr(e, 'status_code'):
-                    error_msg = f"Error code: {e.status_code} - {error_msg}"
-                
-                self.log(f'PRODUCT_ERROR: ID={product.id}, Error="{error_msg}"', 'ERROR')
-                self.stats['errors'] += 1
+                    # Save resume state
+                    self.save_resume_state(product.id)
+                    
+                    # Delay between requests to respect rate limits
+                    if index < total_products:
+                        time.sleep(delay)
+                        
+                except Exception as e:
+                    self.log_product_error(product, e)
+                    self.stats['errors'] += 1
         
         # Summary
         self.log('\n' + '=' * 60)
@@ -1,10 +1,10 @@
-import json
 import os
 import shutil
 from pathlib import Path
 from django.core.management.base import BaseCommand
 from django.conf import settings
 from django.db import transaction
+from primini_backend.products.json_files import load_json_file
 from primini_backend.products.models import Product, Merchant, PriceOffer
 from django.utils.text import slugify
 
@@ -41,8 +41,7 @@ class Command(BaseCommand):
         self.stdout.write(f'Reading JSON file: {json_file}')
         
         try:
-            with open(json_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            data = load_json_file(json_file)
         except Exception as e:
             self.stdout.write(self.style.ERROR(f'Error reading JSON file: {e}'))
             return
@@ -1,4 +1,3 @@
-import json
 import os
 from datetime import datetime
 from pathlib import Path
@@ -7,6 +6,7 @@ from django.core.management.base import BaseCommand
 from django.db import transaction
 from django.utils.text import slugify
 
+from primini_backend.products.json_files import load_json_file
 from primini_backend.products.models import Category, Merchant, Product, PriceOffer
 
 
@@ -120,8 +120,7 @@ class Command(BaseCommand):
             self.stdout.write(f'  Processing: {json_file.name}')
             
             try:
-                with open(json_file, 'r', encoding='utf-8') as f:
-                    products_data = json.load(f)
+                products_data = load_json_file(json_file)
                 
                 for product_data in products_data:
                     self.import_product(product_data, category, stats)
@@ -1,4 +1,3 @@
-import json
 import re
 from pathlib import Path
 
@@ -6,8 +5,12 @@ from django.core.management.base import BaseCommand
 from django.db import transaction
 from django.utils.text import slugify
 
+from primini_backend.products.json_files import load_json_file
 from primini_backend.products.models import Category, Merchant, Product, PriceOffer
 
+# Compiled once; parse_price runs for every offer in the import
+PRICE_STRIP_RE = re.compile(r'[^\d.,]')
+
 
 class Command(BaseCommand):
     help = 'Import products from products_restructured.json file'
@@ -48,8 +51,7 @@ class Command(BaseCommand):
         }
 
         try:
-            with open(json_file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            data = load_json_file(json_file_path)
             
             products_data = data.get('products', [])
             
@@ -141,14 +143,10 @@ class Command(BaseCommand):
         prices = data.get('price', {}) or {}
         urls = data.get('url', {}) or {}
         
-        # Get all merchant names from both dictionaries
-        merchant_names = set(prices.keys()) | set(urls.keys())
-        
-        for merchant_name in merchant_names:
+        # Merchants with only a URL have no price and would be skipped, so only
+        # the price dictionary needs walking; the URL is looked up per merchant
+        for merchant_name, price_value in prices.items():
             try:
-                # Get price value - can be string or array
-                price_value = prices.get(merchant_name)
-                
                 # Handle both string and array prices
                 if price_value is None:
                     continue
@@ -215,7 +213,7 @@ class Command(BaseCommand):
             return 0.0
         
         # Remove currency symbols and spaces
-        price_clean = re.sub(r'[^\d.,]', '', str(price_str))
+        price_clean = PRICE_STRIP_RE.sub('', str(price_str))
         
         # Handle different decimal separators
         if ',' in price_clean and '.' in price_clean:
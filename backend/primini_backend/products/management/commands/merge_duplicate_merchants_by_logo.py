@@ -1,27 +1,27 @@
+from functools import lru_cache
 from django.core.management.base import BaseCommand
 from django.db import transaction
 from django.db.models import Count
-from primini_backend.products.models import Merchant, PriceOffer
-from difflib import SequenceMatcher
+from primini_backend.products.models import Merchant
+from primini_backend.products.matching import indices_above
 import unicodedata
 import os
 
 
+@lru_cache(maxsize=None)
 def normalize_string(s):
-    """Normalize string for comparison (remove accents, lowercase, strip)"""
+    """Normalize string for comparison (remove accents, lowercase, strip); cached per name"""
     if not s:
         return ""
+    # ASCII names have no accents to remove; skip the per-character scan
+    if s.isascii():
+        return s.lower().strip()
     # Remove accents
     s = unicodedata.normalize('NFD', s)
     s = ''.join(c for c in s if unicodedata.category(c) != 'Mn')
     return s.lower().strip()
 
 
-def similarity(a, b):
-    """Calculate similarity between two strings (0-1)"""
-    return SequenceMatcher(None, normalize_string(a), normalize_string(b)).ratio()
-
-
 def has_local_logo(merchant):
     """Check if merchant has a local logo file (starts with /media/merchants or merchants/)"""
     # Check logo_file field (ImageField)
@@ -42,37 +42,44 @@ def has_local_logo(merchant):
 def find_merchant_duplicates(threshold=0.85):
     """Find duplicate merchants based on name similarity"""
     duplicates = []
-    merchants = Merchant.objects.annotate(
+    merchants = list(Merchant.objects.annotate(
         offer_count=Count('offers')
-    ).order_by('name')
+    ).order_by('name'))
+    # Per-merchant features computed once, side by side, rather than per pair
+    names = [normalize_string(merchant.name) for merchant in merchants]
+    lengths = [len(name) for name in names]
     
-    processed = set()
+    # Indexed like merchants; one byte per merchant rather than a set of ids
+    processed = bytearray(len(merchants))
     
     for i, merchant1 in enumerate(merchants):
-        if merchant1.id in processed:
+        if processed[i]:
             continue
         
         similar = [merchant1]
-        for merchant2 in merchants[i+1:]:
-            if merchant2.id in processed:
+        # Later names similar enough, scored in one call (C++ with RapidFuzz)
+        close = {i + 1 + offset for offset in indices_above(names[i], names[i + 1:], threshold)}
+        for j in range(i + 1, len(merchants)):
+            if processed[j]:
                 continue
             
             # Check similarity
-            sim = similarity(merchant1.name, merchant2.name)
-            # Also check if one name contains the other (for cases like "ALPHAX" and "ALPHAX Maroc")
-            name1_norm = normalize_string(merchant1.name)
-            name2_norm = normalize_string(merchant2.name)
-            is_substring_match = (
-                name1_norm in name2_norm or name2_norm in name1_norm
-            ) and len(name1_norm) > 3 and len(name2_norm) > 3  # Avoid matching very short names
+            is_match = j in close
+            if not is_match:
+                # Also check if one name contains the other (for cases like "ALPHAX" and "ALPHAX Maroc");
+                # only the shorter name can be contained in the longer one
+                if lengths[i] <= lengths[j]:
+                    is_match = lengths[i] > 3 and names[i] in names[j]  # Avoid matching very short names
+                else:
+                    is_match = lengths[j] > 3 and names[j] in names[i]
             
-            if sim >= threshold or is_substring_match:
-                similar.append(merchant2)
-                processed.add(merchant2.id)
+            if is_match:
+                similar.append(merchants[j])
+                processed[j] = 1
         
         if len(similar) > 1:
             duplicates.append(similar)
-            processed.add(merchant1.id)
+            processed[i] = 1
     
     return duplicates
 
@@ -130,6 +137,10 @@ class Command(BaseCommand):
         stats = {'moved': 0, 'skipped': 0, 'deleted': 0}
         
         self.stdout.write(f'\n  Keeping: {main.name} (ID: {main.id})')
+        
+        # Main merchant's offers by product (one per product), loaded once and kept
+        # current as offers move so each conflict check is a dict lookup
+        main_offers = {} if dry_run else {offer.product_id: offer for offer in main.offers.all()}
         if has_local_logo(main):
             self.stdout.write(self.style.SUCCESS(f'    ✓ Has local logo: {main.logo_file}'))
         else:
@@ -155,10 +166,7 @@ class Command(BaseCommand):
                 
                 for offer in offers:
                     # Check if main merchant already has an offer for this product
-                    existing_offer = PriceOffer.objects.filter(
-                        product=offer.product,
-                        merchant=main
-                    ).first()
+                    existing_offer = main_offers.get(offer.product_id)
                     
                     if existing_offer:
                         # Keep the one with better price (lower) or more recent
@@ -180,6 +188,7 @@ class Command(BaseCommand):
                         # No conflict, can safely move
                         offer.merchant = main
                         offer.save()
+                        main_offers[offer.product_id] = offer
                         moved_count += 1
                 
                 # Update main merchant info if redundant has better data
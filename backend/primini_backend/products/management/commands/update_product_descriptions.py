@@ -1,9 +1,31 @@
 import json
+import math
+import re
+import sys
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
 from django.core.management.base import BaseCommand
 from django.db import transaction
 from django.utils.text import slugify
+from primini_backend.products.json_files import load_json_file
 from primini_backend.products.models import Product
-from difflib import SequenceMatcher
+from primini_backend.products.matching import scored_matches, similarity_ratio
+
+# Try to import tqdm
+try:
+    from tqdm import tqdm
+    TQDM_AVAILABLE = True
+except ImportError:
+    TQDM_AVAILABLE = False
+
+# Name tokens split on spaces and punctuation; model codes are those containing
+# a digit ("a54", "15", "rtx4060")
+WORD_RE = re.compile(r'\w+')
+MODEL_CODE_RE = re.compile(r'\w*\d\w*')
+
+# Brands are blocked on their first letters so spelling variants of the same
+# brand ("lenovo", "lenovos", "samsung-electronics") still share a bucket
+BRAND_PREFIX_LENGTH = 4
 
 
 def normalize_string(s):
@@ -13,9 +35,17 @@ def normalize_string(s):
     return s.lower().strip()
 
 
-def similarity(a, b):
-    """Calculate similarity between two strings (0-1)"""
-    return SequenceMatcher(None, normalize_string(a), normalize_string(b)).ratio()
+def block_keys(name):
+    """
+    Blocking keys of a normalized name: the start of its first word (usually
+    the brand) and its model codes
+    """
+    first_word = WORD_RE.search(name)
+    if not first_word:
+        return set()
+    keys = {('brand', first_word.group()[:BRAND_PREFIX_LENGTH])}
+    keys.update(('model', code) for code in MODEL_CODE_RE.findall(name) if len(code) > 1)
+    return keys
 
 
 class Command(BaseCommand):
@@ -49,13 +79,18 @@ class Command(BaseCommand):
             action='store_true',
             help='Force replace descriptions even if they are the same (default: False)',
         )
+        parser.add_argument(
+            '--blocking',
+            action='store_true',
+            help='Only compare names sharing the start of the first word or a model code, much faster on large '
+                 'catalogs but misses matches that differ in both',
+        )
 
     def load_json_data(self, json_file):
         """Load and extract products from JSON file"""
         self.stdout.write(f'Loading JSON file: {json_file}')
         
-        with open(json_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        data = load_json_file(json_file)
         
         # Products are at the top level
         products = data.get('products', [])
@@ -63,13 +98,46 @@ class Command(BaseCommand):
         self.stdout.write(f'Found {len(products)} products in JSON file')
         return products
 
-    def find_product_match(self, json_product, threshold=0.85):
-        """Find matching product in database"""
-        json_name = json_product.get('name', '').strip()
-        json_slug = json_product.get('slug', '').strip()
-        
+    def load_product_names(self, blocking=False):
+        """
+        Load every product name once, normalized, for the similarity fallback.
+        Entries are (name, product_id, position) sorted by name length, where
+        position is the product's place in the default name ordering. With
+        blocking, also index the entries by their block keys.
+        """
+        names = [
+            (normalize_string(name), product_id, position)
+            for position, (product_id, name) in enumerate(Product.objects.values_list('id', 'name'))
+        ]
+        names.sort(key=lambda entry: (len(entry[0]), entry[2]))
+        self.product_name_lengths = [len(entry[0]) for entry in names]
+        self.product_name_strings = [entry[0] for entry in names]
+        self.block_index = None
+        if blocking:
+            self.block_index = defaultdict(list)
+            for index, name in enumerate(self.product_name_strings):
+                for key in block_keys(name):
+                    self.block_index[key].append(index)
+        return names
+
+    def candidate_window(self, name_length, threshold):
+        """
+        Slice bounds of the names long or short enough to reach the threshold. The
+        similarity ratio is at most 2*min(la, lb)/(la + lb), so other lengths can never match.
+        """
+        if threshold <= 0:
+            return 0, len(self.product_names)
+        low = math.floor(name_length * threshold / (2 - threshold))
+        high = math.ceil(name_length * (2 - threshold) / threshold)
+        start = bisect_left(self.product_name_lengths, low)
+        end = bisect_right(self.product_name_lengths, high)
+        return start, end
+
+    def find_product_match(self, json_name, json_slug, threshold=0.85):
+        """Find matching product in database from the stripped JSON name and slug"""
         if not json_name:
             return None
+        json_name_normalized = normalize_string(json_name)
         
         # Try exact match by slug first (from JSON)
         if json_slug:
@@ -93,21 +161,40 @@ class Command(BaseCommand):
             # If multiple products with same slug, try to match by name
             products = Product.objects.filter(slug=product_slug)
             for p in products:
-                if similarity(p.name, json_name) >= threshold:
+                if similarity_ratio(normalize_string(p.name), json_name_normalized, threshold) >= threshold:
                     return p
         
-        # Try matching by name similarity
-        all_products = Product.objects.all()
-        best_match = None
-        best_similarity = 0
+        # Try matching by name similarity against the preloaded names. Scraped files often
+        # list the same product more than once, so the scan result is memoized per name
+        if json_name_normalized not in self.name_matches:
+            self.name_matches[json_name_normalized] = self.best_name_match(json_name_normalized, threshold)
+        product_id = self.name_matches[json_name_normalized]
+        
+        if product_id is None:
+            return None
+        return Product.objects.get(pk=product_id)
+
+    def best_name_match(self, name, threshold):
+        """Id of the preloaded product whose name is most similar to name, or None below threshold"""
+        start, end = self.candidate_window(len(name), threshold)
+        if self.block_index is None:
+            candidates = range(start, end)
+            choices = self.product_name_strings[start:end]
+        else:
+            # Only score the names of the same length window sharing a block key with name
+            candidates = sorted({
+                index for key in block_keys(name) for index in self.block_index.get(key, ())
+                if start <= index < end
+            })
+            choices = [self.product_name_strings[index] for index in candidates]
+        matches = scored_matches(name, choices, threshold)
         
-        for product in all_products:
-            sim = similarity(product.name, json_name)
-            if sim >= threshold and sim > best_similarity:
-                best_similarity = sim
-                best_match = product
+        if not matches:
+            return None
         
-        return best_match
+        # Only names above the threshold reach Python; on ties keep the first by name ordering
+        offset, _ = max(matches, key=lambda match: (match[1], -self.product_names[candidates[match[0]]][2]))
+        return self.product_names[candidates[offset]][1]
 
     @transaction.atomic
     def handle(self, *args, **options):
@@ -134,6 +221,10 @@ class Command(BaseCommand):
             self.stdout.write(self.style.ERROR(f'Invalid JSON file: {e}'))
             return
         
+        # Product names only change outside this command, so load them once
+        self.product_names = self.load_product_names(options['blocking'])
+        self.name_matches = {}
+        
         # Statistics
         stats = {
             'matched': 0,
@@ -147,8 +238,15 @@ class Command(BaseCommand):
         # Process each product
         self.stdout.write(f'\n📋 Processing products...')
         
-        for idx, json_product in enumerate(json_products, 1):
-            if idx % 100 == 0:
+        # On an interactive terminal tqdm draws a self-throttled bar on stderr;
+        # otherwise (logs, cron) fall back to periodic progress lines
+        progress_bar = TQDM_AVAILABLE and sys.stderr.isatty()
+        products_iter = enumerate(json_products, 1)
+        if progress_bar:
+            products_iter = tqdm(products_iter, total=len(json_products), desc='Processing', unit='product')
+        
+        for idx, json_product in products_iter:
+            if not progress_bar and idx % 100 == 0:
                 self.stdout.write(f'  Processed {idx}/{len(json_products)} products...')
             
             json_name = json_product.get('name', '').strip()
@@ -167,7 +265,7 @@ class Command(BaseCommand):
                 continue
             
             # Find matching product by name from JSON
-            product = self.find_product_match(json_product, threshold)
+            product = self.find_product_match(json_name, json_product.get('slug', '').strip(), threshold)
             
             if not product:
                 stats['not_found'] += 1
@@ -196,7 +294,7 @@ class Command(BaseCommand):
                 else:
                     self.stdout.write(f'  ✓ Added: {json_name[:50]}... ({len(json_description)} chars)')
             
-            if not dry_run and stats['updated'] % 50 == 0:
+            if not progress_bar and not dry_run and stats['updated'] % 50 == 0:
                 self.stdout.write(f'  Updated {stats["updated"]} products...')
         
         # Summary
@@ -0,0 +1,145 @@
+"""
+Fuzzy name matching shared by the product, merchant and category management commands.
+
+Scores are in 0-1 and computed on strings the caller has already normalized.
+RapidFuzz's Indel ratio (C++) is used when installed; difflib's SequenceMatcher
+is the pure-Python fallback. Both are 2*matches/(len_a + len_b), RapidFuzz
+counting the longest common subsequence, so it never scores below difflib.
+"""
+from difflib import SequenceMatcher
+
+# Try to import RapidFuzz
+try:
+    from rapidfuzz import fuzz, process
+    RAPIDFUZZ_AVAILABLE = True
+except ImportError:
+    RAPIDFUZZ_AVAILABLE = False
+
+
+def _below_cutoff(matcher, score_cutoff):
+    """
+    Whether a SequenceMatcher's cheap upper bounds already rule out score_cutoff:
+    real_quick_ratio only compares lengths, quick_ratio character counts.
+    """
+    return score_cutoff > 0 and (
+        matcher.real_quick_ratio() < score_cutoff or matcher.quick_ratio() < score_cutoff
+    )
+
+
+def similarity_ratio(a, b, score_cutoff=0.0):
+    """Similarity between two normalized strings (0-1); scores under score_cutoff may be reported as 0"""
+    if RAPIDFUZZ_AVAILABLE:
+        return fuzz.ratio(a, b, score_cutoff=score_cutoff * 100) / 100
+    matcher = SequenceMatcher(None, a, b)
+    if _below_cutoff(matcher, score_cutoff):
+        return 0.0
+    return matcher.ratio()
+
+
+def ratio_scorer(query, score_cutoff=0.0):
+    """
+    Return a function scoring candidates against a fixed normalized query.
+    The difflib fallback indexes the query once and reuses one matcher.
+    """
+    if RAPIDFUZZ_AVAILABLE:
+        cutoff = score_cutoff * 100
+        return lambda candidate: fuzz.ratio(candidate, query, score_cutoff=cutoff) / 100
+
+    matcher = SequenceMatcher(None, b=query)
+
+    def score(candidate):
+        matcher.set_seq1(candidate)
+        if _below_cutoff(matcher, score_cutoff):
+            return 0.0
+        return matcher.ratio()
+
+    return score
+
+
+def indices_above(query, choices, threshold):
+    """
+    Indices of the normalized choices scoring at least threshold against query,
+    in ascending order. With RapidFuzz the whole scan runs in one C++ call.
+    """
+    if RAPIDFUZZ_AVAILABLE:
+        matches = process.extract(
+            query, choices, scorer=fuzz.ratio, score_cutoff=threshold * 100, limit=None
+        )
+        return sorted(index for _, _, index in matches)
+    return [
+        index for index, choice in enumerate(choices)
+        if similarity_ratio(query, choice, threshold) >= threshold
+    ]
+
+
+def group_similar_names(names, threshold):
+    """
+    Greedy duplicate groups as lists of indices into names: each name not yet
+    grouped collects the later names scoring at least threshold against it.
+    Only groups of two or more are returned. Works on plain strings so buckets
+    can be handed to worker processes.
+    """
+    # One byte per name rather than a set of indices
+    grouped = bytearray(len(names))
+    groups = []
+    for i, name in enumerate(names):
+        if grouped[i]:
+            continue
+        group = [i]
+        for offset in indices_above(name, names[i + 1:], threshold):
+            j = i + 1 + offset
+            if not grouped[j]:
+                group.append(j)
+                grouped[j] = 1
+        if len(group) > 1:
+            groups.append(group)
+            grouped[i] = 1
+    return groups
+
+
+def cluster_similar_names(names, threshold):
+    """
+    Duplicate groups as connected components of the graph linking names that
+    score at least threshold (transitive closure): names chained through close
+    matches share a group even when the ends of the chain differ more. Groups are
+    ascending index lists ordered by first index; only groups of two or more.
+    """
+    # Union-find over name indices: memory stays O(N) however many pairs match
+    parent = list(range(len(names)))
+
+    def find(i):
+        root = i
+        while parent[root] != root:
+            root = parent[root]
+        # Path compression
+        while parent[i] != root:
+            parent[i], i = root, parent[i]
+        return root
+
+    for i, name in enumerate(names):
+        for offset in indices_above(name, names[i + 1:], threshold):
+            root_i, root_j = find(i), find(i + 1 + offset)
+            if root_i != root_j:
+                parent[max(root_i, root_j)] = min(root_i, root_j)
+
+    components = {}
+    for i in range(len(names)):
+        components.setdefault(find(i), []).append(i)
+    return [group for group in components.values() if len(group) > 1]
+
+
+def scored_matches(query, choices, threshold):
+    """
+    (index, score) pairs of the normalized choices scoring at least threshold
+    against query, in no particular order. Choices are scored as ratio_scorer does.
+    """
+    if RAPIDFUZZ_AVAILABLE:
+        matches = process.extract(
+            query, choices, scorer=fuzz.ratio, score_cutoff=threshold * 100, limit=None
+        )
+        return [(index, score / 100) for _, score, index in matches]
+    score = ratio_scorer(query, threshold)
+    return [
+        (index, sim) for index, sim in ((index, score(choice)) for index, choice in enumerate(choices))
+        if sim >= threshold
+    ]
@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0009_add_merchant_logo_file'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='priceoffer',
+            index=models.Index(condition=models.Q(('approval_status', 'pending')), fields=['-date_updated'], name='offer_pending_recent'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0010_priceoffer_offer_pending_recent'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='priceoffer',
+            unique_together=set(),
+        ),
+        migrations.AddConstraint(
+            model_name='priceoffer',
+            constraint=models.UniqueConstraint(fields=('product', 'merchant'), name='uniq_offer_per_merchant'),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import Q
 from django.core.exceptions import ValidationError
 from django.utils.text import slugify
 
@@ -167,7 +168,14 @@ class PriceOffer(models.Model):
 
     class Meta:
         ordering = ['price']
-        unique_together = ('product', 'merchant')
+        constraints = [
+            # Conflict target for the offer upsert in PriceOfferViewSet.submit
+            models.UniqueConstraint(fields=['product', 'merchant'], name='uniq_offer_per_merchant'),
+        ]
+        indexes = [
+            # Backs the admin `pending` listing (approval_status='pending' ordered by -date_updated)
+            models.Index(fields=['-date_updated'], condition=Q(approval_status='pending'), name='offer_pending_recent'),
+        ]
 
     def __str__(self):
         return f"{self.product} - {self.merchant}"
@@ -123,6 +123,32 @@ class PriceOfferSerializer(serializers.ModelSerializer):
         ]
 
 
+class PendingOfferProductSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Product
+        fields = ['id', 'name', 'slug']
+
+
+class PendingOfferMerchantSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Merchant
+        fields = ['id', 'name']
+
+
+class PendingOfferListSerializer(serializers.ModelSerializer):
+    """Lightweight offer summary for the admin pending queue."""
+    product = PendingOfferProductSerializer(read_only=True)
+    merchant = PendingOfferMerchantSerializer(read_only=True)
+    created_by_email = serializers.EmailField(source='created_by.email', read_only=True)
+
+    class Meta:
+        model = PriceOffer
+        fields = [
+            'id', 'product', 'merchant', 'price', 'currency', 'stock_status',
+            'date_updated', 'approval_status', 'created_by_email'
+        ]
+
+
 class ProductImageSerializer(serializers.ModelSerializer):
     """Serializer for product images (supports both uploaded files and URLs)"""
     image_url_display = serializers.SerializerMethodField()
@@ -644,3 +670,11 @@ class PopularProductSerializer(serializers.ModelSerializer):
     class Meta:
         model = PopularProduct
         fields = ['id', 'product', 'position']
+
+    def to_representation(self, instance):
+        """Project the entry straight into a dict; only the nested product needs a serializer."""
+        return {
+            'id': instance.id,
+            'product': self.fields['product'].to_representation(instance.product),
+            'position': instance.position,
+        }
@@ -0,0 +1,34 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import invalidate_popular_products_cache, invalidate_promotions_cache
+from .models import Category, Merchant, PopularProduct, PriceOffer, Product, Promotion
+
+
+@receiver(post_save, sender=PopularProduct)
+@receiver(post_delete, sender=PopularProduct)
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=PriceOffer)
+@receiver(post_delete, sender=PriceOffer)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_popular_products(sender, **kwargs):
+    """Anything rendered by PopularProductSerializer changed: drop the cached listing."""
+    invalidate_popular_products_cache()
+
+
+@receiver(post_save, sender=Promotion)
+@receiver(post_delete, sender=Promotion)
+@receiver(m2m_changed, sender=Promotion.products.through)
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=PriceOffer)
+@receiver(post_delete, sender=PriceOffer)
+@receiver(post_save, sender=Merchant)
+@receiver(post_delete, sender=Merchant)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_promotions(sender, **kwargs):
+    """Anything rendered by PromotionSerializer changed: invalidate the listing's ETag."""
+    invalidate_promotions_cache()
@@ -0,0 +1,221 @@
+from difflib import SequenceMatcher
+from unittest import mock
+
+from django.test import TestCase
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from primini_backend.users.models import User
+
+from primini_backend.renderers import ORJSONRenderer
+from primini_backend.streaming import stream_json_array
+
+from . import matching
+from .models import Category, Merchant, PopularProduct, PriceOffer, Product, Promotion
+from .serializers import PendingOfferListSerializer
+
+
+class PromotionConditionalGetTests(TestCase):
+    def setUp(self):
+        self.category = Category.objects.create(name='Téléphones')
+        self.product = Product.objects.create(name='Phone X', category=self.category)
+        self.merchant = Merchant.objects.create(name='Shop')
+        self.offer = PriceOffer.objects.create(
+            product=self.product, merchant=self.merchant, price='10.00', approval_status='approved'
+        )
+        self.promotion = Promotion.objects.create(title='Soldes')
+        self.promotion.products.add(self.product)
+        self.api = APIClient()
+
+    def assertChangeInvalidates(self, change):
+        etag = self.api.get('/api/promotions/')['ETag']
+        self.assertEqual(self.api.get('/api/promotions/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        change()
+        response = self.api.get('/api/promotions/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_promotion_change(self):
+        def change():
+            self.promotion.title = 'Black Friday'
+            self.promotion.save()
+        self.assertChangeInvalidates(change)
+
+    def test_product_removed_from_promotion(self):
+        self.assertChangeInvalidates(lambda: self.promotion.products.remove(self.product))
+
+    def test_category_rename(self):
+        def change():
+            self.category.name = 'Smartphones'
+            self.category.save()
+        self.assertChangeInvalidates(change)
+
+    def test_merchant_rename(self):
+        def change():
+            self.merchant.name = 'Boutique'
+            self.merchant.save()
+        self.assertChangeInvalidates(change)
+
+    def test_offer_deleted(self):
+        self.assertChangeInvalidates(self.offer.delete)
+
+
+class StreamJsonArrayTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Téléphones')
+        for i in range(7):
+            product = Product.objects.create(name=f'Phone {i}', category=category)
+            merchant = Merchant.objects.create(name=f'Shop {i}')
+            PriceOffer.objects.create(product=product, merchant=merchant, price=f'{i}9.90')
+
+    def assertStreamsLikeRenderer(self, queryset, chunk_size):
+        streamed = b''.join(stream_json_array(queryset, PendingOfferListSerializer, chunk_size=chunk_size))
+        rendered = ORJSONRenderer().render(PendingOfferListSerializer(queryset, many=True).data)
+        self.assertEqual(streamed, rendered)
+
+    def test_partial_last_chunk(self):
+        self.assertStreamsLikeRenderer(PriceOffer.objects.order_by('pk'), chunk_size=3)
+
+    def test_exact_multiple_of_chunk_size(self):
+        queryset = PriceOffer.objects.order_by('pk')
+        self.assertStreamsLikeRenderer(queryset[:6], chunk_size=3)
+        self.assertStreamsLikeRenderer(queryset, chunk_size=7)
+
+    def test_single_row_chunks(self):
+        self.assertStreamsLikeRenderer(PriceOffer.objects.order_by('pk'), chunk_size=1)
+
+    def test_empty_queryset(self):
+        self.assertStreamsLikeRenderer(PriceOffer.objects.none(), chunk_size=3)
+
+
+class SubmitOfferTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='client@example.com', password='pw-123456789', username='client')
+        self.product = Product.objects.create(name='Phone X', category=Category.objects.create(name='Téléphones'))
+        self.merchant = Merchant.objects.create(name='Shop')
+        self.api = APIClient()
+        self.api.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=self.user).key)
+
+    def submit(self, price):
+        return self.api.post('/api/offers/submit/', {
+            'product_slug': self.product.slug, 'merchant_id': self.merchant.id, 'price': price,
+        }, format='json')
+
+    def test_create_then_update(self):
+        response = self.submit('10.00')
+        self.assertEqual(response.status_code, 201, response.content)
+        offer_id = response.json()['id']
+
+        PriceOffer.objects.filter(pk=offer_id).update(
+            approval_status='rejected', rejection_reason='Prix erroné', raw_price_text='10,00 DH'
+        )
+        response = self.submit('12.00')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['id'], offer_id)
+
+        offer = PriceOffer.objects.get()
+        self.assertEqual(offer.pk, offer_id)
+        self.assertEqual(str(offer.price), '12.00')
+        self.assertEqual(offer.approval_status, 'pending')
+        # Fields the submission does not carry are left as they were
+        self.assertEqual(offer.rejection_reason, 'Prix erroné')
+        self.assertEqual(offer.raw_price_text, '10,00 DH')
+
+
+@mock.patch.object(matching, 'RAPIDFUZZ_AVAILABLE', False)
+class SimilarityRatioFallbackTests(TestCase):
+    def test_scores_match_difflib_above_cutoff(self):
+        for a, b in [('electro planet', 'electroplanet'), ('jumia', 'jumia maroc'), ('abc', 'abc')]:
+            expected = SequenceMatcher(None, a, b).ratio()
+            self.assertEqual(matching.similarity_ratio(a, b), expected)
+            self.assertEqual(matching.similarity_ratio(a, b, expected), expected)
+            self.assertEqual(matching.ratio_scorer(b, expected)(a), expected)
+
+    def test_cheap_bounds_skip_full_ratio(self):
+        with mock.patch.object(SequenceMatcher, 'ratio') as ratio:
+            # Lengths alone rule this out (real_quick_ratio), then character counts (quick_ratio)
+            self.assertEqual(matching.similarity_ratio('zara', 'zara home maroc', 0.85), 0.0)
+            self.assertEqual(matching.similarity_ratio('marjane', 'carrefour', 0.85), 0.0)
+            self.assertEqual(matching.ratio_scorer('carrefour', 0.85)('marjane'), 0.0)
+        ratio.assert_not_called()
+
+
+class OfferModerationTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            email='admin@example.com', password='pw-123456789', username='admin', role='admin'
+        )
+        product = Product.objects.create(name='Phone X', category=Category.objects.create(name='Téléphones'))
+        self.offer = PriceOffer.objects.create(
+            product=product, merchant=Merchant.objects.create(name='Shop'), price='10.00',
+            approval_status='pending',
+        )
+        self.api = APIClient()
+        self.api.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=self.admin).key)
+
+    def test_approve_pending_offer(self):
+        response = self.api.post(f'/api/offers/{self.offer.pk}/approve/')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['approval_status'], 'approved')
+        self.assertEqual(response.json()['approved_by_email'], self.admin.email)
+        self.offer.refresh_from_db()
+        self.assertEqual(self.offer.approval_status, 'approved')
+        self.assertEqual(self.offer.approved_at, self.offer.date_updated)
+
+        response = self.api.post(f'/api/offers/{self.offer.pk}/reject/', {'rejection_reason': 'Prix erroné'})
+        self.assertEqual(response.status_code, 400, response.content)
+        self.offer.refresh_from_db()
+        self.assertEqual(self.offer.approval_status, 'approved')
+
+    def test_reject_pending_offer(self):
+        response = self.api.post(f'/api/offers/{self.offer.pk}/reject/', {'rejection_reason': 'Prix erroné'})
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['rejection_reason'], 'Prix erroné')
+        self.assertEqual(PriceOffer.objects.get().approval_status, 'rejected')
+
+    def test_unknown_offer(self):
+        self.assertEqual(self.api.post('/api/offers/9999/approve/').status_code, 404)
+        self.assertEqual(self.api.post('/api/offers/abc/reject/').status_code, 404)
+
+    def test_non_admin_cannot_moderate(self):
+        user = User.objects.create_user(email='client@example.com', password='pw-123456789', username='client')
+        self.api.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=user).key)
+        self.assertEqual(self.api.post(f'/api/offers/{self.offer.pk}/approve/').status_code, 403)
+        self.assertEqual(PriceOffer.objects.get().approval_status, 'pending')
+
+
+class PopularProductConditionalGetTests(TestCase):
+    def setUp(self):
+        self.product = Product.objects.create(name='Phone X', category=Category.objects.create(name='Téléphones'))
+        PopularProduct.objects.create(product=self.product)
+        self.merchant = Merchant.objects.create(name='Shop')
+        self.api = APIClient()
+
+    def get(self, if_none_match=None):
+        headers = {} if if_none_match is None else {'HTTP_IF_NONE_MATCH': if_none_match}
+        return self.api.get('/api/popular-products/', **headers)
+
+    def test_matching_etag_is_not_modified(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        for header in (etag, f'"other", {etag}', f'W/{etag}', '*'):
+            response = self.get(header)
+            self.assertEqual(response.status_code, 304, header)
+            self.assertEqual(response['ETag'], etag)
+
+    def test_partial_tags_do_not_match(self):
+        etag = self.get()['ETag']
+        version = etag.strip('"')
+        for header in (f'"{version}0"', f'"x{version}"', f'"{version}', f'x{etag}x', '"other"'):
+            self.assertEqual(self.get(header).status_code, 200, header)
+
+    def test_offer_write_invalidates(self):
+        etag = self.get()['ETag']
+        PriceOffer.objects.create(
+            product=self.product, merchant=self.merchant, price='10.00', approval_status='approved'
+        )
+        response = self.get(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(self.get(response['ETag']).status_code, 304)
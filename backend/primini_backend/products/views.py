@@ -1,10 +1,15 @@
 import csv
 import io
-from datetime import datetime
+from datetime import datetime, timezone as dt_timezone
 from decimal import Decimal, InvalidOperation
 
+from django.core.cache import cache
 from django.db.models import Min, Q
 from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.utils.http import parse_etags
+from django.views.decorators.http import condition
+from django.views.decorators.vary import vary_on_headers
 from rest_framework import filters, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.parsers import MultiPartParser, FormParser
@@ -17,12 +22,21 @@ except ImportError:
     EXCEL_SUPPORT = False
 
 from rest_framework.permissions import IsAuthenticated
+from primini_backend.streaming import streaming_json_response
 from primini_backend.users.permissions import IsAdminOrClient, IsAdminOrReadOnly, CanApproveProduct, IsAdmin
 
+from .cache import (
+    POPULAR_PRODUCTS_CACHE_TIMEOUT,
+    invalidate_popular_products_cache,
+    invalidate_promotions_cache,
+    popular_products_cache_version,
+    promotions_cache_version,
+)
 from .models import Category, Merchant, PopularProduct, PriceOffer, Product, Promotion
 from .serializers import (
     CategorySerializer,
     MerchantSerializer,
+    PendingOfferListSerializer,
     PopularProductSerializer,
     PriceOfferSerializer,
     ProductCreateUpdateSerializer,
@@ -620,7 +634,11 @@ class ProductViewSet(viewsets.ModelViewSet):
 
 
 class PriceOfferViewSet(viewsets.ModelViewSet):
-    queryset = PriceOffer.objects.select_related('product', 'product__category', 'merchant', 'created_by', 'approved_by')
+    # PriceOfferSerializer nests the product (with category/subcategory children)
+    # and merchant, so join/prefetch everything it reads up front.
+    queryset = PriceOffer.objects.select_related(
+        'product', 'product__category', 'product__subcategory', 'merchant', 'created_by', 'approved_by'
+    ).prefetch_related('product__category__children', 'product__subcategory__children')
     serializer_class = PriceOfferSerializer
     filter_backends = [filters.OrderingFilter]
     ordering_fields = ['price', 'date_updated']
@@ -650,7 +668,6 @@ class PriceOfferViewSet(viewsets.ModelViewSet):
     def submit(self, request):
         """Allow logged-in users to submit new price offers"""
         from .serializers import PriceOfferSubmitSerializer
-        from django.utils import timezone
         
         serializer = PriceOfferSubmitSerializer(data=request.data)
         if not serializer.is_valid():
@@ -685,106 +702,139 @@ class PriceOfferViewSet(viewsets.ModelViewSet):
         if not merchant:
             return Response({'detail': 'Merchant is required'}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Check if offer already exists
-        existing_offer = PriceOffer.objects.filter(product=product, merchant=merchant).first()
-        
-        if existing_offer:
-            # Update existing offer but set to pending if not admin
-            if request.user.is_admin:
-                existing_offer.approval_status = 'approved'
-                existing_offer.approved_by = request.user
-                existing_offer.approved_at = timezone.now()
-            else:
-                existing_offer.approval_status = 'pending'
-                existing_offer.approved_by = None
-                existing_offer.approved_at = None
-            
-            existing_offer.price = data['price']
-            existing_offer.url = data.get('url', '')
-            existing_offer.stock_status = data.get('stock_status', 'in_stock')
-            existing_offer.currency = data.get('currency', 'MAD')
-            existing_offer.created_by = request.user
-            existing_offer.merchant_name = data.get('merchant_name', '')
-            existing_offer.save()
-            
-            offer_serializer = PriceOfferSerializer(existing_offer, context={'request': request})
-            return Response(offer_serializer.data, status=status.HTTP_200_OK)
-        else:
-            # Create new offer
-            offer = PriceOffer.objects.create(
-                product=product,
-                merchant=merchant,
-                price=data['price'],
-                url=data.get('url', ''),
-                stock_status=data.get('stock_status', 'in_stock'),
-                currency=data.get('currency', 'MAD'),
-                created_by=request.user,
-                merchant_name=data.get('merchant_name', ''),
-                approval_status='approved' if request.user.is_admin else 'pending',
-                approved_by=request.user if request.user.is_admin else None,
-                approved_at=timezone.now() if request.user.is_admin else None
-            )
-            
-            offer_serializer = PriceOfferSerializer(offer, context={'request': request})
-            return Response(offer_serializer.data, status=status.HTTP_201_CREATED)
+        is_admin = request.user.is_admin
+        approved_at = timezone.now() if is_admin else None
+        
+        # Create the offer, or overwrite the existing one for this product/merchant.
+        # update_or_create locks the existing row (SELECT ... FOR UPDATE) and retries
+        # the lookup if a concurrent submission inserted it first, so `created` is
+        # reliable. raw_price_text and rejection_reason are left as they were.
+        # A resubmitted offer goes back to pending unless submitted by an admin.
+        offer, created = PriceOffer.objects.update_or_create(
+            product=product,
+            merchant=merchant,
+            defaults={
+                'price': data['price'],
+                'url': data.get('url', ''),
+                'stock_status': data.get('stock_status', 'in_stock'),
+                'currency': data.get('currency', 'MAD'),
+                'created_by': request.user,
+                'merchant_name': data.get('merchant_name', ''),
+                'approval_status': 'approved' if is_admin else 'pending',
+                'approved_by': request.user if is_admin else None,
+                'approved_at': approved_at,
+            },
+        )
+        
+        offer_serializer = PriceOfferSerializer(offer, context={'request': request})
+        return Response(
+            offer_serializer.data,
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK,
+        )
     
+    def _update_if_pending(self, offer, now, **fields):
+        """
+        Apply `fields` to the offer only if it is still pending.
+        The status check and the write happen in a single UPDATE, so two admins
+        acting on the same offer cannot both succeed. On success the fields are
+        also set on `offer`. Returns the row count.
+        """
+        fields['date_updated'] = now
+        updated = PriceOffer.objects.filter(pk=offer.pk, approval_status='pending').update(**fields)
+        if updated:
+            for name, value in fields.items():
+                setattr(offer, name, value)
+            # update() bypasses post_save
+            invalidate_popular_products_cache()
+            invalidate_promotions_cache()
+        return updated
+
     @action(detail=True, methods=['post'], permission_classes=[IsAdmin])
     def approve(self, request, pk=None):
         """Approve a pending offer (admin only)"""
-        from django.utils import timezone
-        
+        # get_object() applies the queryset filtering and object permissions
+        # (and raises 404) before anything is written
         offer = self.get_object()
+        now = timezone.now()
+        updated = self._update_if_pending(
+            offer,
+            now,
+            approval_status='approved',
+            approved_by=request.user,
+            approved_at=now,
+            rejection_reason='',
+        )
         
-        if offer.approval_status != 'pending':
+        if not updated:
             return Response(
                 {'detail': 'Only pending offers can be approved'},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        offer.approval_status = 'approved'
-        offer.approved_by = request.user
-        offer.approved_at = timezone.now()
-        offer.rejection_reason = ''
-        offer.save()
-        
         serializer = self.get_serializer(offer)
         return Response(serializer.data)
     
     @action(detail=True, methods=['post'], permission_classes=[IsAdmin])
     def reject(self, request, pk=None):
         """Reject a pending offer (admin only)"""
+        # get_object() applies the queryset filtering and object permissions
+        # (and raises 404) before anything is written
         offer = self.get_object()
+        updated = self._update_if_pending(
+            offer,
+            timezone.now(),
+            approval_status='rejected',
+            rejection_reason=request.data.get('rejection_reason', ''),
+        )
         
-        if offer.approval_status != 'pending':
+        if not updated:
             return Response(
                 {'detail': 'Only pending offers can be rejected'},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        rejection_reason = request.data.get('rejection_reason', '')
-        offer.approval_status = 'rejected'
-        offer.rejection_reason = rejection_reason
-        offer.save()
-        
         serializer = self.get_serializer(offer)
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'], permission_classes=[IsAdmin])
     def pending(self, request):
         """Get all pending offers (admin only)"""
+        # Only load the columns PendingOfferListSerializer renders
         pending_offers = PriceOffer.objects.filter(approval_status='pending').select_related(
             'product', 'merchant', 'created_by'
+        ).only(
+            'id', 'price', 'currency', 'stock_status', 'date_updated', 'approval_status',
+            'product__id', 'product__name', 'product__slug',
+            'merchant__id', 'merchant__name',
+            'created_by__email',
         ).order_by('-date_updated')
         
         page = self.paginate_queryset(pending_offers)
         if page is not None:
-            serializer = self.get_serializer(page, many=True)
+            serializer = PendingOfferListSerializer(page, many=True)
             return self.get_paginated_response(serializer.data)
         
-        serializer = self.get_serializer(pending_offers, many=True)
-        return Response(serializer.data)
+        # Without pagination, stream the rows instead of materializing them all
+        return streaming_json_response(pending_offers, PendingOfferListSerializer)
+
+
+def _promotions_etag(request, *args, **kwargs):
+    """
+    Version of the promotions listing, bumped by signals whenever anything
+    PromotionSerializer renders changes (promotions and their product M2M,
+    products, offers, merchants, categories). A cache read, no query.
+    """
+    return f'promotions-{promotions_cache_version()}'
 
 
+def _promotions_last_modified(request, *args, **kwargs):
+    # The version is the time of the last change. Last-Modified only has second
+    # resolution, so clients also get the ETag, which takes precedence
+    return datetime.fromtimestamp(promotions_cache_version() / 1e9, tz=dt_timezone.utc)
+
+
+@method_decorator(vary_on_headers('Authorization'), name='list')
+@method_decorator(condition(etag_func=_promotions_etag, last_modified_func=_promotions_last_modified), name='list')
 class PromotionViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Promotion.objects.prefetch_related('products__offers__merchant')
     serializer_class = PromotionSerializer
@@ -793,3 +843,23 @@ class PromotionViewSet(viewsets.ReadOnlyModelViewSet):
 class PopularProductViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = PopularProduct.objects.select_related('product', 'product__category')
     serializer_class = PopularProductSerializer
+
+    def list(self, request, *args, **kwargs):
+        """
+        Serve the listing from cache, keyed on a version bumped whenever the
+        underlying data changes. The version doubles as the ETag so clients
+        revalidating an unchanged listing get a 304 without touching the DB.
+        """
+        version = popular_products_cache_version()
+        etag = f'"popular-products-{version}"'
+        # Whole-tag comparison (weak, as for If-None-Match), not a substring test
+        if_none_match = parse_etags(request.headers.get('If-None-Match', ''))
+        if if_none_match == ['*'] or etag in (tag.removeprefix('W/') for tag in if_none_match):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+        
+        cache_key = f'popular-products:{version}:{request.build_absolute_uri()}'
+        data = cache.get(cache_key)
+        if data is None:
+            data = super().list(request, *args, **kwargs).data
+            cache.set(cache_key, data, POPULAR_PRODUCTS_CACHE_TIMEOUT)
+        return Response(data, headers={'ETag': etag})
@@ -0,0 +1,38 @@
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+    ORJSON_SUPPORT = True
+except ImportError:
+    ORJSON_SUPPORT = False
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSON renderer backed by orjson when it is installed.
+    Types orjson does not handle natively (Decimal, lazy strings, datetimes)
+    go through DRF's encoder so the output matches JSONRenderer. Indented
+    output requests, UNICODE_JSON/COMPACT_JSON turned off and installs
+    without orjson fall back to JSONRenderer.
+
+    Differences from JSONRenderer on the orjson path:
+    - NaN and Infinity are rendered as null instead of raising (STRICT_JSON).
+    - Non-str dict keys are converted by orjson (OPT_NON_STR_KEYS), so
+      datetime, UUID and enum keys follow orjson's formats, not str().
+    """
+
+    _encoder = JSONEncoder()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if not ORJSON_SUPPORT or data is None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        ret = orjson.dumps(
+            data,
+            default=self._encoder.default,
+            option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+        )
+        # Escaped like JSONRenderer so the output stays a strict JavaScript subset
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
@@ -0,0 +1,52 @@
+import copy
+import threading
+
+from django.utils.functional import cached_property
+from rest_framework import serializers
+
+_fields_cache = {}
+_fields_cache_lock = threading.Lock()
+
+
+class CachedFieldsMixin:
+    """
+    Build a serializer class's fields once per process instead of once per instance.
+    ModelSerializer.get_fields() introspects the model on every instantiation;
+    for serializers whose fields do not depend on the instance or context, the
+    result is cached per class and each instance gets a deep copy to bind, as
+    DRF does for declared fields, so nested serializers and ListSerializer
+    children are never shared between instances.
+    """
+
+    @classmethod
+    def _fields_template(cls):
+        fields = _fields_cache.get(cls)
+        if fields is None:
+            with _fields_cache_lock:
+                fields = _fields_cache.get(cls)
+                if fields is None:
+                    fields = _fields_cache[cls] = super(CachedFieldsMixin, cls()).get_fields()
+        return fields
+
+    def get_fields(self):
+        return copy.deepcopy(self._fields_template())
+
+    @cached_property
+    def _readable_fields(self):
+        # DRF re-filters `fields` through a generator for every row it renders;
+        # the bound fields never change once built, so filter them once
+        return tuple(field for field in self.fields.values() if not field.write_only)
+
+
+class CachedFieldsModelSerializer(CachedFieldsMixin, serializers.ModelSerializer):
+    """ModelSerializer with fields built once per class (see CachedFieldsMixin)."""
+
+
+def warm_fields_cache(*serializer_classes):
+    """
+    Build the cached field templates up front, from an AppConfig.ready() hook.
+    Model introspection cannot run at class definition time (the app registry
+    may still be loading), so this moves it from the first request to startup.
+    """
+    for serializer_class in serializer_classes:
+        serializer_class._fields_template()
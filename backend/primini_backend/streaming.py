@@ -0,0 +1,37 @@
+from itertools import islice
+
+from django.http import StreamingHttpResponse
+
+from primini_backend.renderers import ORJSONRenderer
+
+
+def stream_json_array(queryset, serializer_class, chunk_size=500, context=None):
+    """
+    Yield a JSON array of serialized rows, `chunk_size` rows at a time.
+    Rows are read with QuerySet.iterator() (a server-side cursor on PostgreSQL),
+    so neither the model instances nor the serialized data are ever all in memory.
+    Chunks are rendered like the API's default renderer (orjson when installed).
+    """
+    renderer = ORJSONRenderer()
+    rows = queryset.iterator(chunk_size=chunk_size)
+    yield b'['
+    first = True
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        # Render the chunk as an array and strip its brackets
+        body = renderer.render(serializer_class(chunk, many=True, context=context).data)[1:-1]
+        if not first:
+            yield b','
+        yield body
+        first = False
+    yield b']'
+
+
+def streaming_json_response(queryset, serializer_class, chunk_size=500, context=None):
+    """Return a StreamingHttpResponse rendering `queryset` as a JSON array."""
+    return StreamingHttpResponse(
+        stream_json_array(queryset, serializer_class, chunk_size=chunk_size, context=context),
+        content_type='application/json',
+    )
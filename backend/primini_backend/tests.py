@@ -0,0 +1,77 @@
+import uuid
+from datetime import date, datetime, time, timezone
+from decimal import Decimal
+
+from django.test import SimpleTestCase
+from django.utils.translation import gettext_lazy as _
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+
+from .renderers import ORJSONRenderer
+from .serializers import CachedFieldsModelSerializer
+from .users.models import User
+
+
+class ORJSONRendererTests(SimpleTestCase):
+    payload = {
+        'count': 2,
+        'next': None,
+        'results': [
+            {
+                'id': 1,
+                'price': Decimal('1299.90'),
+                'ratio': 0.25,
+                'in_stock': True,
+                'date_updated': datetime(2024, 5, 17, 9, 30, 12, 345678, tzinfo=timezone.utc),
+                'release_date': date(2024, 5, 1),
+                'opening_time': time(8, 30),
+                'uuid': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+                'status_display': _('Approved'),
+                'name': 'Téléphone « Galaxy » 5G\u2028ligne',
+                'tags': ('promo', 'nouveau'),
+                'prices_by_year': {2023: Decimal('1399.00'), 2024: Decimal('1299.90')},
+            },
+            {'id': 2, 'price': Decimal('0.00'), 'date_updated': None, 'name': ''},
+        ],
+    }
+
+    def test_matches_json_renderer(self):
+        self.assertEqual(ORJSONRenderer().render(self.payload), JSONRenderer().render(self.payload))
+
+    def test_indent_falls_back_to_json_renderer(self):
+        self.assertEqual(
+            ORJSONRenderer().render(self.payload, 'application/json; indent=4'),
+            JSONRenderer().render(self.payload, 'application/json; indent=4'),
+        )
+
+    def test_nan_is_rendered_as_null(self):
+        self.assertEqual(ORJSONRenderer().render({'ratio': float('nan')}), b'{"ratio":null}')
+
+
+class NameSerializer(serializers.Serializer):
+    name = serializers.CharField()
+
+
+class UserWithNestedSerializer(CachedFieldsModelSerializer):
+    profile = NameSerializer(source='*', read_only=True)
+    groups = NameSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = User
+        fields = ['id', 'email', 'profile', 'groups']
+
+
+class CachedFieldsMixinTests(SimpleTestCase):
+    def test_bound_fields_are_not_shared_between_instances(self):
+        first = UserWithNestedSerializer(context={'request': 'first'})
+        second = UserWithNestedSerializer(context={'request': 'second'})
+        for name in ('email', 'profile', 'groups'):
+            self.assertIsNot(first.fields[name], second.fields[name])
+        self.assertIsNot(first.fields['groups'].child, second.fields['groups'].child)
+        self.assertIsNot(first.fields['profile'].fields['name'], second.fields['profile'].fields['name'])
+
+        for serializer in (first, second):
+            self.assertIs(serializer.fields['profile'].parent, serializer)
+            self.assertIs(serializer.fields['groups'].child.parent, serializer.fields['groups'])
+            self.assertEqual(serializer.fields['groups'].child.context, serializer.context)
+
@@ -1,3 +1,5 @@
+from functools import cached_property
+
 from django.apps import AppConfig
 
 
@@ -5,3 +7,18 @@ class UsersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'primini_backend.users'
     verbose_name = 'Utilisateurs'
+
+    def ready(self):
+        from primini_backend.serializers import warm_fields_cache
+
+        from .serializers import UserDetailSerializer, UserListSerializer, UserSerializer
+
+        warm_fields_cache(UserListSerializer, UserDetailSerializer, UserSerializer)
+
+    @cached_property
+    def common_passwords(self):
+        # Shared by every SharedCommonPasswordValidator in this process. Loaded on
+        # first use, so workers and commands that never validate a password skip it
+        from .validators import DEFAULT_PASSWORD_LIST_PATH, SortedPasswordList
+
+        return SortedPasswordList.from_file(DEFAULT_PASSWORD_LIST_PATH)
@@ -0,0 +1,53 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.mail import send_mail
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+# Small bounded pool: SMTP latency stays off the request thread without
+# letting a burst of reset requests spawn unbounded threads.
+_email_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='password-reset-email')
+
+
+PASSWORD_RESET_SUBJECT = 'Réinitialisation de votre mot de passe - Avita'
+PASSWORD_RESET_MESSAGE = '''
+Bonjour,
+
+Vous avez demandé à réinitialiser votre mot de passe sur Avita.
+
+Votre code de vérification est : {otp_code}
+
+Ce code est valide pendant 10 minutes.
+
+Si vous n'avez pas demandé cette réinitialisation, veuillez ignorer cet email.
+
+Cordialement,
+L'équipe Avita
+                '''
+
+
+def send_password_reset_otp(email, otp_code):
+    """Send the password reset OTP email."""
+    send_mail(
+        subject=PASSWORD_RESET_SUBJECT,
+        message=PASSWORD_RESET_MESSAGE.format_map({'otp_code': otp_code}),
+        from_email=settings.DEFAULT_FROM_EMAIL or 'noreply@avita.ma',
+        recipient_list=[email],
+        fail_silently=False,
+    )
+
+
+def _log_send_failure(future):
+    if future.exception() is not None:
+        logger.error('Failed to send password reset email', exc_info=future.exception())
+
+
+def dispatch_password_reset_otp(email, otp_code):
+    """Queue the OTP email on the background pool once the OTP row is committed."""
+    def submit():
+        _email_executor.submit(send_password_reset_otp, email, otp_code).add_done_callback(_log_send_failure)
+
+    transaction.on_commit(submit)
@@ -0,0 +1,27 @@
+from django.db import migrations, models
+
+
+def invalidate_duplicate_active_otps(apps, schema_editor):
+    """Keep only the most recent unused OTP per user before adding the constraint."""
+    PasswordResetOTP = apps.get_model('users', 'PasswordResetOTP')
+    seen_users = set()
+    for otp in PasswordResetOTP.objects.filter(is_used=False).order_by('user_id', '-created_at', '-id'):
+        if otp.user_id in seen_users:
+            PasswordResetOTP.objects.filter(pk=otp.pk).update(is_used=True)
+        else:
+            seen_users.add(otp.user_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0007_passwordresetotp'),
+    ]
+
+    operations = [
+        migrations.RunPython(invalidate_duplicate_active_otps, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='passwordresetotp',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_used', False)), fields=('user',), name='one_active_otp'),
+        ),
+    ]
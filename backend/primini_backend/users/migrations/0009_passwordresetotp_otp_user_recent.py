@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0008_passwordresetotp_one_active_otp'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='passwordresetotp',
+            index=models.Index(fields=['user', '-created_at'], name='otp_user_recent'),
+        ),
+    ]
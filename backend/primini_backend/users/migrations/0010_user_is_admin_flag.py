@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('users', '0009_passwordresetotp_otp_user_recent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='is_admin_flag',
+            field=models.GeneratedField(db_persist=True, expression=models.Q(('role', 'admin'), ('is_superuser', True), _connector='OR'), output_field=models.BooleanField()),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(condition=models.Q(('is_admin_flag', False)), fields=['-date_joined'], name='client_users_recent'),
+        ),
+    ]
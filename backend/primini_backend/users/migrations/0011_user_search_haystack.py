@@ -0,0 +1,34 @@
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+def create_search_trigram_index(apps, schema_editor):
+    """Trigram GIN index so `search_haystack LIKE '%...%'` avoids a sequential scan (PostgreSQL only)."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS users_search_trgm ON users_user USING gin (search_haystack gin_trgm_ops)'
+    )
+
+
+def drop_search_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS users_search_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0010_user_is_admin_flag'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='search_haystack',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.text.Upper(django.db.models.functions.text.Concat('email', models.Value('\n'), 'username', models.Value('\n'), 'first_name', models.Value('\n'), 'last_name')), output_field=models.TextField()),
+        ),
+        migrations.RunPython(create_search_trigram_index, drop_search_trigram_index),
+    ]
@@ -0,0 +1,19 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0011_user_search_haystack'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='passwordresetotp',
+            name='users_passw_user_id_b6e19c_idx',
+        ),
+        migrations.AddIndex(
+            model_name='passwordresetotp',
+            index=models.Index(condition=models.Q(('is_used', False)), fields=['user', 'otp_code', '-created_at'], name='otp_active_lookup'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+from django.db import migrations
+
+
+def create_search_prefix_indexes(apps, schema_editor):
+    """Indexes matching the UPPER(col::text) LIKE 'AB%' SQL of istartswith (PostgreSQL only)."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS users_email_upper_prefix ON users_user (UPPER(email::text) text_pattern_ops)'
+    )
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS users_username_upper_prefix ON users_user (UPPER(username::text) text_pattern_ops)'
+    )
+
+
+def drop_search_prefix_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS users_email_upper_prefix')
+    schema_editor.execute('DROP INDEX IF EXISTS users_username_upper_prefix')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0012_passwordresetotp_otp_active_lookup'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_prefix_indexes, drop_search_prefix_indexes),
+    ]
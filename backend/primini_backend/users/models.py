@@ -1,6 +1,8 @@
 from django.contrib.auth.base_user import BaseUserManager
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import Q, Value
+from django.db.models.functions import Concat, Upper
 from django.utils import timezone
 from datetime import timedelta
 import secrets
@@ -52,16 +54,43 @@ class User(AbstractUser):
     enterprise_name = models.CharField('nom de l\'entreprise', max_length=200, blank=True, null=True)
     address = models.TextField('adresse', blank=True, null=True)
     phone_number = models.CharField('numéro de téléphone', max_length=20, blank=True, null=True)
+    # Database-side mirror of `is_admin`, so admin filters hit one indexed column
+    is_admin_flag = models.GeneratedField(
+        expression=Q(role='admin') | Q(is_superuser=True),
+        output_field=models.BooleanField(),
+        db_persist=True,
+    )
+    # Upper-cased search text for the admin user search; trigram-indexed on PostgreSQL
+    search_haystack = models.GeneratedField(
+        expression=Upper(Concat(
+            'email', Value('\n'), 'username', Value('\n'), 'first_name', Value('\n'), 'last_name',
+        )),
+        output_field=models.TextField(),
+        db_persist=True,
+    )
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = []
 
     objects = UserManager()
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Backs the admin user listing (is_admin_flag=False ordered by -date_joined)
+            models.Index(fields=['-date_joined'], condition=Q(is_admin_flag=False), name='client_users_recent'),
+        ]
+
     @property
     def is_admin(self):
         return self.role == 'admin' or self.is_superuser
 
+    @property
+    def effective_role(self):
+        """Role exposed by the API: superusers are always reported as admins."""
+        if self.is_superuser:
+            return 'admin'
+        return self.role or 'visitor'
+
     @property
     def is_client(self):
         return self.role == 'client'
@@ -78,6 +107,10 @@ class User(AbstractUser):
         return self.username or self.email
 
 
+class OTPCooldownError(Exception):
+    """Raised when a new OTP is requested less than a minute after the previous one."""
+
+
 class PasswordResetOTP(models.Model):
     """Model to store OTP codes for password reset with expiration."""
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='password_reset_otps')
@@ -90,7 +123,22 @@ class PasswordResetOTP(models.Model):
     class Meta:
         ordering = ['-created_at']
         indexes = [
-            models.Index(fields=['user', 'otp_code']),
+            # OTP verification: unused codes only, newest first
+            models.Index(
+                fields=['user', 'otp_code', '-created_at'],
+                condition=Q(is_used=False),
+                name='otp_active_lookup',
+            ),
+            models.Index(fields=['user', '-created_at'], name='otp_user_recent'),
+        ]
+        constraints = [
+            # At most one unused OTP per user; generate_otp invalidates the
+            # previous one before creating a new one.
+            models.UniqueConstraint(
+                fields=['user'],
+                condition=Q(is_used=False),
+                name='one_active_otp',
+            ),
         ]
     
     def __str__(self):
@@ -98,21 +146,36 @@ class PasswordResetOTP(models.Model):
     
     @classmethod
     def generate_otp(cls, user):
-        """Generate a new 6-digit OTP for the user."""
-        # Invalidate any existing unused OTPs for this user
-        cls.objects.filter(user=user, is_used=False).update(is_used=True)
-        
+        """
+        Generate a new 6-digit OTP for the user.
+        Raises OTPCooldownError if the user already has an unused OTP issued
+        within the last minute.
+        """
         # Generate 6-digit OTP
-        otp_code = ''.join([str(secrets.randbelow(10)) for _ in range(6)])
+        otp_code = f'{secrets.randbelow(1_000_000):06d}'
         
         # Create OTP with 10 minutes expiration
-        expires_at = timezone.now() + timedelta(minutes=10)
+        now = timezone.now()
+        expires_at = now + timedelta(minutes=10)
         
-        return cls.objects.create(
-            user=user,
-            otp_code=otp_code,
-            expires_at=expires_at
-        )
+        # Invalidate unused OTPs older than the cooldown, then insert. An unused
+        # OTP younger than a minute survives the UPDATE, so the one_active_otp
+        # constraint rejects the INSERT: the cooldown check is the constraint.
+        # On conflict the whole block rolls back, so no savepoint is needed.
+        try:
+            with transaction.atomic():
+                cls.objects.filter(
+                    user=user,
+                    is_used=False,
+                    created_at__lt=now - timedelta(minutes=1)
+                ).update(is_used=True)
+                return cls.objects.create(
+                    user=user,
+                    otp_code=otp_code,
+                    expires_at=expires_at
+                )
+        except IntegrityError:
+            raise OTPCooldownError()
     
     def is_valid(self):
         """Check if OTP is still valid (not used and not expired)."""
@@ -120,12 +183,17 @@ class PasswordResetOTP(models.Model):
     
     def verify(self):
         """Mark OTP as used and verified."""
-        if self.is_valid():
+        # Check and mark in a single UPDATE so a code can only be consumed once
+        now = timezone.now()
+        updated = PasswordResetOTP.objects.filter(
+            pk=self.pk,
+            is_used=False,
+            expires_at__gt=now
+        ).update(is_used=True, verified_at=now)
+        if updated:
             self.is_used = True
-            self.verified_at = timezone.now()
-            self.save()
-            return True
-        return False
+            self.verified_at = now
+        return updated == 1
     
     def can_retry(self):
         """Check if user can request a new OTP (1 minute cooldown)."""
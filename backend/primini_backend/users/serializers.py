@@ -1,17 +1,50 @@
 from dj_rest_auth.serializers import UserDetailsSerializer, LoginSerializer
 from rest_framework import serializers
 from django.contrib.auth import authenticate
-from django.core.mail import send_mail
-from django.conf import settings
-from django.utils import timezone
+from django.core.signing import BadSignature, TimestampSigner
+from django.db import transaction
+from django.db.models import Min
+from django.utils.crypto import constant_time_compare, salted_hmac
 from datetime import timedelta
 
-from .models import User, PasswordResetOTP
+from primini_backend.products.serializers import ProductListSerializer
+from primini_backend.serializers import CachedFieldsMixin, CachedFieldsModelSerializer
+from .emails import dispatch_password_reset_otp
+from .models import OTPCooldownError, User, PasswordResetOTP
 
+RESET_TOKEN_MAX_AGE = timedelta(hours=1)
 
-class UserListSerializer(serializers.ModelSerializer):
+# Built once: the signer derives its key from SECRET_KEY and the salt
+_reset_token_signer = TimestampSigner(salt='primini_backend.users.password_reset')
+
+
+def _password_fingerprint(user):
+    """Short digest of the password hash, binding a reset token to the current password."""
+    return salted_hmac('primini_backend.users.password_reset', user.password).hexdigest()[:20]
+
+
+class ProductsCountField(serializers.IntegerField):
+    """
+    Number of products created by the user. Read from the `products_count`
+    annotation on UserViewSet's queryset, and only counted when it is absent.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, user):
+        count = getattr(user, 'products_count', None)
+        if count is None:
+            # count() reuses a prefetched created_products list when there is one
+            count = user.created_products.count()
+        return count
+
+
+class UserListSerializer(CachedFieldsModelSerializer):
     """Serializer for listing users with basic info and product count."""
-    products_count = serializers.SerializerMethodField()
+    products_count = ProductsCountField()
     is_active = serializers.BooleanField()
     date_joined = serializers.DateTimeField()
     last_login = serializers.DateTimeField(read_only=True, allow_null=True)
@@ -23,15 +56,11 @@ class UserListSerializer(serializers.ModelSerializer):
             'role', 'is_active', 'date_joined', 'last_login', 'products_count'
         )
         read_only_fields = ('id', 'date_joined', 'last_login', 'products_count')
-    
-    def get_products_count(self, obj):
-        """Get the count of products created by this user."""
-        return obj.created_products.count()
 
 
-class UserDetailSerializer(serializers.ModelSerializer):
+class UserDetailSerializer(CachedFieldsModelSerializer):
     """Serializer for user details with product history."""
-    products_count = serializers.SerializerMethodField()
+    products_count = ProductsCountField()
     products = serializers.SerializerMethodField()
     is_active = serializers.BooleanField()
     date_joined = serializers.DateTimeField()
@@ -46,19 +75,33 @@ class UserDetailSerializer(serializers.ModelSerializer):
         )
         read_only_fields = ('id', 'date_joined', 'last_login', 'products_count', 'products', 'is_staff', 'is_superuser')
     
-    def get_products_count(self, obj):
-        """Get the count of products created by this user."""
-        return obj.created_products.count()
-    
     def get_products(self, obj):
-        """Get the list of products created by this user."""
-        from primini_backend.products.serializers import ProductListSerializer
-        products = obj.created_products.all().order_by('-created_at')[:50]  # Limit to 50 most recent
+        """
+        Get the 50 most recent products created by this user.
+        Clients that page through `/users/{id}/products/` instead can skip
+        loading them with `?include_products=0` (an empty list is returned).
+        """
+        request = self.context.get('request')
+        if request is not None and request.query_params.get('include_products') == '0':
+            return []
+        
+        # Load everything ProductListSerializer reads up front, and skip the
+        # JSON columns it does not render
+        products = obj.created_products.select_related(
+            'category', 'subcategory'
+        ).prefetch_related(
+            'category__children__children', 'subcategory__children'
+        ).annotate(
+            lowest_price=Min('offers__price')
+        ).defer(
+            'specs', 'raw_price_map', 'raw_url_map'
+        ).order_by('-created_at')[:50]  # Limit to 50 most recent
         return ProductListSerializer(products, many=True).data
 
 
-class UserSerializer(UserDetailsSerializer):
-    role = serializers.CharField(read_only=True)
+class UserSerializer(CachedFieldsMixin, UserDetailsSerializer):
+    # Superusers always report role='admin'
+    role = serializers.CharField(read_only=True, source='effective_role')
     id = serializers.IntegerField(read_only=True, source='pk')
     username = serializers.CharField(read_only=True, allow_blank=True, allow_null=True, required=False)
     is_active = serializers.BooleanField(read_only=True)
@@ -67,47 +110,6 @@ class UserSerializer(UserDetailsSerializer):
         model = User
         fields = ('id', 'username', 'email', 'first_name', 'last_name', 'role', 'is_active')
         read_only_fields = ('id', 'email', 'role', 'username', 'is_active')
-    
-    def to_representation(self, instance):
-        """Ensure all required fields are included and superusers return role='admin'."""
-        # Get base representation from parent
-        representation = super().to_representation(instance)
-        
-        # Ensure id is present (convert from pk if needed)
-        if 'id' not in representation:
-            representation['id'] = instance.pk
-        if 'pk' in representation:
-            # Keep id, remove pk to avoid duplication
-            if 'id' not in representation:
-                representation['id'] = representation['pk']
-            del representation['pk']
-        
-        # Ensure username is included (can be None)
-        if 'username' not in representation:
-            representation['username'] = getattr(instance, 'username', None)
-        
-        # Ensure role is included
-        if 'role' not in representation:
-            representation['role'] = getattr(instance, 'role', 'visitor')
-        
-        # If user is a superuser, always return role='admin'
-        if instance.is_superuser:
-            representation['role'] = 'admin'
-        
-        # Ensure all required fields are present
-        required_fields = ['id', 'username', 'email', 'first_name', 'last_name', 'role']
-        for field in required_fields:
-            if field not in representation:
-                if field == 'id':
-                    representation['id'] = instance.pk
-                elif field == 'username':
-                    representation['username'] = getattr(instance, 'username', None)
-                elif field == 'role':
-                    representation['role'] = 'admin' if instance.is_superuser else getattr(instance, 'role', 'visitor')
-                else:
-                    representation[field] = getattr(instance, field, '')
-        
-        return representation
 
 
 class CustomLoginSerializer(LoginSerializer):
@@ -118,34 +120,25 @@ class CustomLoginSerializer(LoginSerializer):
         password = attrs.get('password')
         
         if username and password:
-            # Try to get the user first to check if account exists and is active
-            try:
-                user = User.objects.get(email=username)
-                if not user.is_active:
+            # Authenticate the user; the backend loads the user row itself
+            user = authenticate(request=self.context.get('request'), username=username, password=password)
+            
+            # Inactive accounts are rejected by the backend, so only look the
+            # user up again on failure, to pick the right error message
+            if not user or not user.is_active:
+                if user or User.objects.filter(email=username, is_active=False).exists():
                     raise serializers.ValidationError(
                         'Votre compte n\'est pas encore activé. Un administrateur vous contactera dès que votre compte sera approuvé.'
                     )
-            except User.DoesNotExist:
-                pass  # Let authenticate handle invalid credentials
-            
-            # Authenticate the user
-            user = authenticate(request=self.context.get('request'), username=username, password=password)
-            
-            if not user:
                 raise serializers.ValidationError('Identifiants incorrects.')
             
-            if not user.is_active:
-                raise serializers.ValidationError(
-                    'Votre compte n\'est pas encore activé. Un administrateur vous contactera dès que votre compte sera approuvé.'
-                )
-            
             attrs['user'] = user
             return attrs
         else:
             raise serializers.ValidationError('Les identifiants sont requis.')
 
 
-class RegistrationSerializer(serializers.ModelSerializer):
+class RegistrationSerializer(CachedFieldsModelSerializer):
     password1 = serializers.CharField(write_only=True)
     password2 = serializers.CharField(write_only=True)
     role = serializers.CharField(write_only=True, required=False)
@@ -209,65 +202,34 @@ class PasswordResetRequestSerializer(serializers.Serializer):
     """Serializer for requesting password reset OTP."""
     email = serializers.EmailField(required=True)
     
-    def validate_email(self, value):
-        """Check if user exists."""
-        try:
-            user = User.objects.get(email=value)
-            if not user.is_active:
-                raise serializers.ValidationError('Ce compte n\'est pas actif.')
-        except User.DoesNotExist:
-            # Don't reveal if email exists for security
-            pass
-        return value
+    def validate(self, attrs):
+        """Look the user up once and check the account is active."""
+        user = User.objects.filter(email=attrs['email']).first()
+        if user is not None and not user.is_active:
+            raise serializers.ValidationError({'email': 'Ce compte n\'est pas actif.'})
+        # None when the email is unknown; don't reveal that for security
+        attrs['user'] = user
+        return attrs
     
     def save(self):
         """Generate and send OTP."""
-        email = self.validated_data['email']
+        user = self.validated_data['user']
+        if user is None:
+            # Don't reveal if email exists for security
+            return {'message': 'Si cette adresse email existe, un code de vérification a été envoyé.'}
+        
+        # The 1 minute cooldown is enforced by the database in generate_otp
         try:
-            user = User.objects.get(email=email)
-            
-            # Check if user can request a new OTP (1 minute cooldown)
-            one_minute_ago = timezone.now() - timedelta(minutes=1)
-            recent_otp = PasswordResetOTP.objects.filter(
-                user=user,
-                created_at__gte=one_minute_ago,
-                is_used=False
-            ).first()
-            
-            if recent_otp:
-                raise serializers.ValidationError(
-                    'Veuillez attendre 1 minute avant de demander un nouveau code.'
-                )
-            
-            # Generate OTP
             otp = PasswordResetOTP.generate_otp(user)
-            
-            # Send email with OTP
-            send_mail(
-                subject='Réinitialisation de votre mot de passe - Avita',
-                message=f'''
-Bonjour,
-
-Vous avez demandé à réinitialiser votre mot de passe sur Avita.
-
-Votre code de vérification est : {otp.otp_code}
-
-Ce code est valide pendant 10 minutes.
-
-Si vous n'avez pas demandé cette réinitialisation, veuillez ignorer cet email.
-
-Cordialement,
-L'équipe Avita
-                ''',
-                from_email=settings.DEFAULT_FROM_EMAIL or 'noreply@avita.ma',
-                recipient_list=[user.email],
-                fail_silently=False,
+        except OTPCooldownError:
+            raise serializers.ValidationError(
+                'Veuillez attendre 1 minute avant de demander un nouveau code.'
             )
-            
-            return {'message': 'Un code de vérification a été envoyé à votre adresse email.'}
-        except User.DoesNotExist:
-            # Don't reveal if email exists for security
-            return {'message': 'Si cette adresse email existe, un code de vérification a été envoyé.'}
+        
+        # Send email with OTP in the background, after the OTP is committed
+        dispatch_password_reset_otp(user.email, otp.otp_code)
+        
+        return {'message': 'Un code de vérification a été envoyé à votre adresse email.'}
 
 
 class PasswordResetVerifyOTPSerializer(serializers.Serializer):
@@ -294,13 +256,12 @@ class PasswordResetVerifyOTPSerializer(serializers.Serializer):
             if not otp.is_valid():
                 raise serializers.ValidationError('Code de vérification expiré. Veuillez en demander un nouveau.')
             
-            # Mark OTP as verified
-            otp.verify()
+            # Mark OTP as verified (fails if it was consumed concurrently)
+            if not otp.verify():
+                raise serializers.ValidationError('Code de vérification expiré. Veuillez en demander un nouveau.')
             
             # Generate JWT-like token using Django's signing
-            from django.core.signing import Signer
-            signer = Signer()
-            reset_token = signer.sign(f'password_reset:{user.id}:{otp.id}')
+            reset_token = _reset_token_signer.sign_object({'uid': user.id, 'pwd': _password_fingerprint(user)})
             
             attrs['user'] = user
             attrs['reset_token'] = reset_token
@@ -328,44 +289,39 @@ class PasswordResetSerializer(serializers.Serializer):
         if attrs['new_password'] != attrs['confirm_password']:
             raise serializers.ValidationError({'confirm_password': 'Les mots de passe ne correspondent pas.'})
         
-        # Verify token
-        from django.core.signing import Signer, BadSignature
-        signer = Signer()
-        
+        # Verify token; the signature alone proves the OTP step succeeded
         try:
-            signed_value = signer.unsign(attrs['reset_token'], max_age=timedelta(hours=1))
-            # Token format: password_reset:user_id:otp_id
-            parts = signed_value.split(':')
-            if len(parts) != 3 or parts[0] != 'password_reset':
-                raise serializers.ValidationError({'reset_token': 'Token invalide.'})
-            
-            user_id = int(parts[1])
-            otp_id = int(parts[2])
-            
-            try:
-                user = User.objects.get(id=user_id)
-                otp = PasswordResetOTP.objects.get(id=otp_id, user=user, is_used=True)
-                
-                # Check if OTP was verified recently (within 1 hour)
-                if not otp.verified_at or (timezone.now() - otp.verified_at) > timedelta(hours=1):
-                    raise serializers.ValidationError({'reset_token': 'Token expiré. Veuillez recommencer le processus.'})
-                
-                attrs['user'] = user
-                return attrs
-            except (User.DoesNotExist, PasswordResetOTP.DoesNotExist):
-                raise serializers.ValidationError({'reset_token': 'Token invalide.'})
+            payload = _reset_token_signer.unsign_object(attrs['reset_token'], max_age=RESET_TOKEN_MAX_AGE)
+            user_id = int(payload['uid'])
+            fingerprint = payload['pwd']
         except BadSignature:
             raise serializers.ValidationError({'reset_token': 'Token invalide ou expiré.'})
+        except (KeyError, TypeError, ValueError):
+            raise serializers.ValidationError({'reset_token': 'Token invalide.'})
+        
+        try:
+            user = User.objects.get(id=user_id)
+        except User.DoesNotExist:
+            raise serializers.ValidationError({'reset_token': 'Token invalide.'})
+        
+        # Stale once the password has changed, so each token works only once
+        if not constant_time_compare(fingerprint, _password_fingerprint(user)):
+            raise serializers.ValidationError({'reset_token': 'Token expiré. Veuillez recommencer le processus.'})
+        
+        attrs['user'] = user
+        return attrs
     
     def save(self):
         """Reset user password."""
         user = self.validated_data['user']
         new_password = self.validated_data['new_password']
         
-        user.set_password(new_password)
-        user.save()
-        
-        # Invalidate all OTPs for this user
-        PasswordResetOTP.objects.filter(user=user, is_used=False).update(is_used=True)
+        # Password change and OTP invalidation commit together
+        with transaction.atomic():
+            user.set_password(new_password)
+            user.save(update_fields=['password'])
+            
+            # Invalidate all OTPs for this user
+            PasswordResetOTP.objects.filter(user=user, is_used=False).update(is_used=True)
         
         return {'message': 'Votre mot de passe a été réinitialisé avec succès.'}
@@ -0,0 +1,106 @@
+import json
+
+from django.apps import apps
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from primini_backend.products.models import Category, Merchant, PriceOffer, Product, ProductImage
+from primini_backend.products.serializers import ProductDetailSerializer
+
+from .models import User
+from .validators import SharedCommonPasswordValidator
+
+
+class SharedCommonPasswordValidatorTests(SimpleTestCase):
+    def test_password_list_loaded_on_first_validation(self):
+        config = apps.get_app_config('users')
+        config.__dict__.pop('common_passwords', None)
+
+        validator = SharedCommonPasswordValidator()
+        self.assertNotIn('common_passwords', config.__dict__)
+
+        with self.assertRaises(ValidationError):
+            validator.validate('password123')
+        validator.validate('Tr0mbone-Cartable-Azur')
+        self.assertIs(validator.passwords, config.common_passwords)
+        self.assertIs(SharedCommonPasswordValidator().passwords, config.common_passwords)
+
+
+class UserDetailProductsTests(TestCase):
+    def setUp(self):
+        admin = User.objects.create_user(email='admin@example.com', password='pw-123456789', username='admin', role='admin')
+        self.client_user = User.objects.create_user(email='client@example.com', password='pw-123456789', username='client')
+        category = Category.objects.create(name='Téléphones')
+        for name in ('Phone X', 'Phone Y'):
+            Product.objects.create(name=name, category=category, created_by=self.client_user)
+        self.api = APIClient()
+        self.api.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=admin).key)
+
+    def test_products_included_by_default(self):
+        response = self.api.get(f'/api/users/{self.client_user.pk}/')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual([p['name'] for p in response.json()['products']], ['Phone Y', 'Phone X'])
+
+    def test_products_opt_out(self):
+        response = self.api.get(f'/api/users/{self.client_user.pk}/', {'include_products': '0'})
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['products'], [])
+        self.assertEqual(response.json()['products_count'], 2)
+
+
+class UserProductsActionTests(TestCase):
+    def setUp(self):
+        admin = User.objects.create_user(email='admin@example.com', password='pw-123456789', username='admin', role='admin')
+        self.client_user = User.objects.create_user(email='client@example.com', password='pw-123456789', username='client')
+        parent = Category.objects.create(name='High-tech')
+        category = Category.objects.create(name='Téléphones', parent=parent)
+        merchants = [Merchant.objects.create(name=name) for name in ('Shop', 'Boutique')]
+        for i in range(3):
+            product = Product.objects.create(
+                name=f'Phone {i}', category=parent, subcategory=category, created_by=self.client_user
+            )
+            ProductImage.objects.create(product=product, image_url=f'https://example.com/{i}.jpg')
+            for j, merchant in enumerate(merchants):
+                PriceOffer.objects.create(
+                    product=product, merchant=merchant, price=f'{i}{j}9.00', created_by=self.client_user
+                )
+        self.api = APIClient()
+        self.api.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=admin).key)
+
+    def test_renders_product_details(self):
+        response = self.api.get(f'/api/users/{self.client_user.pk}/products/')
+        self.assertEqual(response.status_code, 200, response.content)
+        expected = ProductDetailSerializer(
+            Product.objects.filter(created_by=self.client_user).order_by('-created_at'), many=True
+        ).data
+        self.assertEqual(response.json()['results'], json.loads(JSONRenderer().render(expected)))
+        self.assertEqual(len(response.json()['results'][0]['offers']), 2)
+        self.assertEqual(len(response.json()['results'][0]['images']), 1)
+
+    def test_query_count_does_not_grow_with_products(self):
+        url = f'/api/users/{self.client_user.pk}/products/'
+        self.api.get(url)
+        with CaptureQueriesContext(connection) as three_products:
+            self.api.get(url)
+        Product.objects.filter(name='Phone 0').delete()
+        with CaptureQueriesContext(connection) as two_products:
+            self.api.get(url)
+        self.assertEqual(len(three_products), len(two_products))
+
+
+class IsAdminTests(TestCase):
+    def test_role_change_is_seen_by_the_authenticated_user(self):
+        admin = User.objects.create_user(email='admin@example.com', password='pw-123456789', username='admin', role='admin')
+        user, _ = TokenAuthentication().authenticate_credentials(Token.objects.create(user=admin).key)
+        self.assertTrue(user.is_admin)
+
+        user.role = 'client'
+        self.assertFalse(user.is_admin)
+        user.is_superuser = True
+        self.assertTrue(user.is_admin)
@@ -0,0 +1,67 @@
+import bisect
+import gzip
+from array import array
+from functools import cached_property
+from pathlib import Path
+
+from django.apps import apps
+from django.contrib.auth import password_validation
+from django.contrib.auth.password_validation import CommonPasswordValidator
+
+DEFAULT_PASSWORD_LIST_PATH = Path(password_validation.__file__).resolve().parent / 'common-passwords.txt.gz'
+
+
+class SortedPasswordList:
+    """
+    Read-only password list stored as one sorted, deduplicated bytes blob.
+    Membership is a binary search over entry offsets, which keeps the list
+    in a single contiguous buffer instead of ~20k separate str objects.
+    """
+
+    def __init__(self, passwords):
+        entries = sorted({password.encode('utf-8') for password in passwords if password})
+        self._blob = b'\n'.join(entries)
+        self._offsets = array('I')
+        position = 0
+        for entry in entries:
+            self._offsets.append(position)
+            position += len(entry) + 1
+
+    @classmethod
+    def from_file(cls, path):
+        """Load a (possibly gzipped) password list, one password per line."""
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                return cls(line.strip() for line in f)
+        except OSError:
+            with open(path) as f:
+                return cls(line.strip() for line in f)
+
+    def _entry_at(self, offset):
+        end = self._blob.find(b'\n', offset)
+        return self._blob[offset:] if end == -1 else self._blob[offset:end]
+
+    def __contains__(self, password):
+        needle = password.encode('utf-8')
+        index = bisect.bisect_left(self._offsets, needle, key=self._entry_at)
+        return index < len(self._offsets) and self._entry_at(self._offsets[index]) == needle
+
+    def __len__(self):
+        return len(self._offsets)
+
+
+class SharedCommonPasswordValidator(CommonPasswordValidator):
+    """
+    CommonPasswordValidator that reuses the password list cached on UsersConfig
+    instead of decompressing it per validator instance. The list is only
+    loaded the first time a password is validated.
+    """
+
+    def __init__(self, password_list_path=None):
+        self.password_list_path = password_list_path
+
+    @cached_property
+    def passwords(self):
+        if self.password_list_path is None:
+            return apps.get_app_config('users').common_passwords
+        return SortedPasswordList.from_file(self.password_list_path)
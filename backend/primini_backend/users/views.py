@@ -3,7 +3,8 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
-from django.db.models import Count, Q
+from django.db.models import Count, Min, Prefetch, Q, Value
+from django.db.models.functions import Upper
 
 from .models import User
 from .serializers import (
@@ -13,6 +14,8 @@ from .serializers import (
 )
 from .permissions import IsAdmin
 from primini_backend.pagination import CustomPageNumberPagination
+from primini_backend.products.models import PriceOffer, Product
+from primini_backend.products.serializers import ProductDetailSerializer
 
 
 class CustomUserDetailsView(UserDetailsView):
@@ -34,6 +37,11 @@ class UserViewSet(viewsets.ReadOnlyModelViewSet):
     ).order_by('-date_joined')
     permission_classes = [IsAdmin]
     pagination_class = CustomPageNumberPagination
+    # Columns rendered by UserListSerializer (products_count is annotated)
+    list_only_fields = (
+        'id', 'username', 'email', 'first_name', 'last_name',
+        'role', 'is_active', 'date_joined', 'last_login',
+    )
     
     def get_serializer_class(self):
         if self.action == 'retrieve':
@@ -44,7 +52,7 @@ class UserViewSet(viewsets.ReadOnlyModelViewSet):
         queryset = super().get_queryset()
         
         # Only return non-admin users (clients)
-        queryset = queryset.exclude(role='admin')
+        queryset = queryset.filter(is_admin_flag=False)
         
         # Filter by active status if provided
         is_active = self.request.query_params.get('is_active')
@@ -52,17 +60,18 @@ class UserViewSet(viewsets.ReadOnlyModelViewSet):
             is_active_bool = is_active.lower() == 'true'
             queryset = queryset.filter(is_active=is_active_bool)
         
-        # Search by email, username, first_name, last_name
-        search = self.request.query_params.get('search')
-        if search:
-            queryset = queryset.filter(
-                Q(email__icontains=search) |
-                Q(username__icontains=search) |
-                Q(first_name__icontains=search) |
-                Q(last_name__icontains=search)
-            )
+        # Search by email, username, first_name, last_name (case-insensitive, see User.search_haystack).
+        # Single characters are ignored, and two-character searches match
+        # email/username prefixes, since trigrams need at least three characters.
+        search = (self.request.query_params.get('search') or '').strip()
+        if len(search) >= 3:
+            queryset = queryset.filter(search_haystack__contains=Upper(Value(search)))
+        elif len(search) == 2:
+            queryset = queryset.filter(Q(email__istartswith=search) | Q(username__istartswith=search))
         
-        return queryset
+        if self.action == 'list':
+            return queryset.only(*self.list_only_fields)
+        return queryset.defer('password', 'search_haystack')
     
     @action(detail=True, methods=['post'])
     def activate(self, request, pk=None):
@@ -98,12 +107,20 @@ class UserViewSet(viewsets.ReadOnlyModelViewSet):
     def products(self, request, pk=None):
         """Get all products created by a specific user."""
         user = self.get_object()
-        from primini_backend.products.serializers import ProductDetailSerializer
-        from primini_backend.products.models import Product
         
+        # Load everything ProductDetailSerializer renders up front. Each offer's
+        # product is the prefetching product itself, so the lowest_price
+        # annotation also serves the ProductListSerializer nested in the offers
         products = Product.objects.filter(created_by=user).select_related(
-            'category', 'created_by', 'approved_by'
-        ).prefetch_related('offers__merchant').order_by('-created_at')
+            'category', 'subcategory', 'created_by', 'approved_by'
+        ).prefetch_related(
+            'category__children__children',
+            'subcategory__children',
+            'images',
+            Prefetch('offers', queryset=PriceOffer.objects.select_related('merchant', 'created_by', 'approved_by')),
+        ).annotate(
+            lowest_price=Min('offers__price')
+        ).order_by('-created_at')
         
         # Filter by approval status if provided
         approval_status = request.query_params.get('approval_status')